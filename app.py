@@ -4,69 +4,65 @@
 首次模式选择弹窗 → 首页（扭蛋机区域背景图/红黑按钮）→ 扭蛋动画 → 结果弹窗 → 记录 → 本周总结独立页。
 """
 import html as html_module
-import json
+import io
+import random
+import re
+import secrets
 import uuid
 from pathlib import Path
 from typing import Optional
 
 import streamlit as st
 
+import budget
+import draw_history
+import draw_store
+from asset_cache import path_data_uri, path_url
+from asset_pipeline import BALL_PX, FOOD_ICON_PX, MACHINE_PX, pick_variant
 from config.foods import draw
-from db import save_record, get_week_stats, get_week_records, get_record_by_id, update_record, delete_record
+from db import init_db, save_record, get_week_stats, get_records_page, get_record_by_id, update_record, delete_record, claim_legacy_records, count_legacy_records
+from gashapon_component import gashapon, publish_frontend
+from icon_atlas import food_icon
+from records_io import FORMATS, guess_format, import_records, iter_export
 
-_DRAW_CACHE = {}
-CACHE_DIR = Path(__file__).resolve().parent / "data" / "draw_cache"
+_USER_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
 ASSETS = Path(__file__).resolve().parent / "assets"
-FOOD_ICONS = ASSETS / "food-icons"
+FOOD_ICON_SIZE = 64  # 结果卡片图标边长（CSS px）
 
 
-def _asset_data_uri(relative_path: str) -> Optional[str]:
-    """将 assets 下图片读为 data URI，便于嵌入 HTML 无需静态服务。"""
-    path = ASSETS / relative_path
-    if not path.exists():
-        return None
-    try:
-        raw = path.read_bytes()
-        ext = path.suffix.lower()
-        mime = "image/png" if ext == ".png" else "image/jpeg" if ext in (".jpg", ".jpeg") else "image/png"
-        import base64
-        b64 = base64.b64encode(raw).decode("ascii")
-        return f"data:{mime};base64,{b64}"
-    except Exception:
-        return None
+def _image_src(path: Path) -> Optional[str]:
+    """
+    图片地址：开启 server.enableStaticServing 时用带内容哈希的静态 URL（浏览器缓存，页面只传地址），
+    否则（或发布失败时）退回内嵌 data URI。文件不存在返回 None。
+    """
+    if st.get_option("server.enableStaticServing"):
+        url = path_url(path)
+        if url:
+            return url
+    return path_data_uri(path)
 
 
-def _save_draw_result(tid: str, result: dict) -> None:
-    """抽卡结果写入文件，跳转后可从任意进程读取。"""
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    path = CACHE_DIR / f"{tid}.json"
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False)
+def _asset_src(relative_path: str, min_width: int) -> Optional[str]:
+    """assets 下图片的地址：按显示宽度 min_width（CSS px × 2 倍屏）选 asset_pipeline 构建的最小变体（未构建则原图）。"""
+    return _image_src(pick_variant(relative_path, min_width))
 
 
-def _load_draw_result(tid: str) -> Optional[dict]:
-    """从文件读取抽卡结果；不在此处删文件，由关闭弹窗时清理（兼容 Python 3.7）。"""
-    path = CACHE_DIR / f"{tid}.json"
-    if not path.exists():
+def _food_icon(result: dict) -> Optional[dict]:
+    """结果卡片图标：图集（或 sprite）地址 + 只露出该品类一格的 CSS 背景定位参数；没有图标返回 None。"""
+    tile = food_icon(result.get("品类") or "", result.get("菜品名") or "")
+    if tile is None:
         return None
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
+        relative_path = tile.path.relative_to(ASSETS).as_posix()
+    except ValueError:
+        src = _image_src(tile.path)
+    else:
+        src = _asset_src(relative_path, tile.sheet_width(FOOD_ICON_PX))
+    if not src:
         return None
+    return dict(tile.css(FOOD_ICON_SIZE), src=src)
 
 
-def _delete_draw_result(tid: str) -> None:
-    """删除某次抽卡的缓存文件。"""
-    if not tid:
-        return
-    path = CACHE_DIR / f"{tid}.json"
-    try:
-        if path.exists():
-            path.unlink()
-    except OSError:
-        pass
-
 # 主色（方便后续修改）
 TEAL = "#4ECDC4"
 TEAL_LIGHT = "#E8F8F5"
@@ -78,6 +74,13 @@ GRAY_SMALL = "#999999"
 BUTTON_GRAY = "#EAECEE"  # 按钮未点击统一浅灰
 SUBTITLE_YELLOW = "#F9E79F"  # 副标题暖黄
 
+# 首页扭蛋机组件里两种模式的角标与按钮配色
+MODE_STYLES = {
+    "减脂": {"icon": "🥗", "badge": "#2d8a7a", "bg": TEAL, "color": "#fff"},
+    "放纵": {"icon": "🍟", "badge": "#d35400", "bg": RED, "color": "#fff"},
+}
+MODE_IDLE = {"bg": BUTTON_GRAY, "color": GRAY_TEXT}
+
 
 def inject_css():
     st.markdown(
@@ -182,12 +185,25 @@ def init_session():
         ("animating", False),
         ("draw_tid", None),
         ("last_result_tid", None),  # 用于避免 show_result 后重复 rerun 死循环
-        ("draw_tid_for_cleanup", None),  # 关闭弹窗时删对应缓存文件
+        ("draw_tid_for_cleanup", None),  # 关闭弹窗时删对应暂存结果
         ("editing_record_id", None),   # 本周总结里正在编辑的记录 id
         ("delete_confirm_id", None),   # 待确认删除的记录 id
+        ("recap_cursors", [None]),     # 本周明细分页：每页起始游标，末项为当前页
+        ("user_id", ""),               # 浏览器 localStorage 生成的用户 ID，随 ?uid= 带回；空串为未识别/旧数据
+        ("gashapon_event_id", None),   # 已处理的扭蛋机组件事件 id
+        ("gashapon_reply", None),      # 最近一次组件内抽卡的结果，随组件参数送回页面
+        ("script_runs", 0),            # 本会话脚本运行次数：每次用户操作应只多 1（按钮走 on_click，不再 st.rerun）
     ]:
         if k not in st.session_state:
             st.session_state[k] = v
+    if "draw_rng" not in st.session_state:
+        _seed_draws(secrets.randbits(32))
+
+
+def _seed_draws(seed: int) -> None:
+    """本会话抽卡用的随机数发生器：同一种子、同样的模式顺序，抽出的结果序列完全一致（?seed= 可重放）。"""
+    st.session_state.draw_seed = seed
+    st.session_state.draw_rng = random.Random(seed)
 
 
 def inject_mode_modal():
@@ -351,174 +367,285 @@ def render_result_modal(r, is_diet):
     )
     rc0, rc1, rc2, rc3 = st.columns([2, 3, 3, 2])
     with rc1:
-        if st.button("再抽一次", key="btn_again", use_container_width=True):
-            _delete_draw_result(st.session_state.get("draw_tid_for_cleanup") or "")
-            result_new = draw(st.session_state.mode)
-            tid_new = str(uuid.uuid4())
-            _DRAW_CACHE[tid_new] = result_new
-            _save_draw_result(tid_new, result_new)
-            st.session_state["draw_tid"] = tid_new
-            st.session_state["draw_tid_for_cleanup"] = tid_new
-            st.session_state.show_modal = False
-            st.session_state.result = None
-            st.session_state.last_result_tid = None
-            st.session_state["gashapon_animate"] = (result_new, tid_new)
-            st.rerun()
+        st.button("再抽一次", key="btn_again", use_container_width=True, on_click=_on_draw_again)
     with rc2:
-        if st.button("就吃这个", key="btn_confirm", use_container_width=True):
-            _delete_draw_result(st.session_state.get("draw_tid_for_cleanup") or "")
-            st.session_state.show_modal = False
-            st.session_state.draw_tid_for_cleanup = None
-            st.session_state.last_result_tid = None
-            st.session_state.show_record_form = True
-            st.session_state.record_prefill = {"菜品名": r["菜品名"], "热量": r["热量"], "模式": r["模式"], "品类": r["品类"]}
-            st.rerun()
-
-
-def _gashapon_html(mode: str, result: Optional[dict] = None, tid: str = "", machine_src: str = "", ball_src: str = "", ball_left_src: str = "", ball_right_src: str = "", food_icon_src: str = "", hide_draw_btn: bool = False, mode_label: str = "减脂", bg_diet: str = "", color_diet: str = "", bg_indulge: str = "", color_indulge: str = "") -> str:
-    """生成整页 HTML（标题+模式+扭蛋机）放入单 iframe，避免重复渲染。"""
-    if not machine_src:
-        _svg = '<svg xmlns="http://www.w3.org/2000/svg" width="200" height="260"><rect width="200" height="260" rx="16" fill="#4ECDC4"/><text x="100" y="140" text-anchor="middle" fill="#fff" font-size="18">扭蛋机</text></svg>'
-        machine_src = "data:image/svg+xml," + html_module.escape(_svg)
-    if not ball_src:
-        ball_src = "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='48' height='48'%3E%3Ccircle cx='24' cy='24' r='22' fill='%234ECDC4'/%3E%3C/svg%3E"
-    if not ball_left_src:
-        ball_left_src = ball_src
-    if not ball_right_src:
-        ball_right_src = ball_src
-    result_json = ""
-    if result:
-        payload = {k: v for k, v in result.items() if isinstance(v, (str, int, float, list)) or v is None}
-        if food_icon_src:
-            payload["foodIconUrl"] = food_icon_src
-        result_json = json.dumps(payload, ensure_ascii=False)
-    confirm_url = html_module.escape(f"?record=1&tid={tid}", quote=True) if tid else "#"
-    redraw_url = "?draw=1"
-    result_icon_style = "" if food_icon_src else "display:none;"
-
-    template_path = ASSETS / "gashapon_template.html"
-    if not template_path.exists():
-        return "<p>扭蛋机模板未找到</p>"
-    html = template_path.read_text(encoding="utf-8")
-    html = html.replace("__MACHINE_SRC__", html_module.escape(machine_src))
-    html = html.replace("__BALL_SRC__", html_module.escape(ball_src))
-    html = html.replace("__BALL_LEFT_SRC__", html_module.escape(ball_left_src))
-    html = html.replace("__BALL_RIGHT_SRC__", html_module.escape(ball_right_src))
-    html = html.replace("__FOOD_ICON_SRC__", html_module.escape(food_icon_src) if food_icon_src else "")
-    html = html.replace("__RESULT_ICON_STYLE__", result_icon_style)
-    html = html.replace("__REDRAW_URL__", redraw_url)
-    html = html.replace("__CONFIRM_URL__", confirm_url)
-    html = html.replace("__RESULT_JSON__", json.dumps(result_json) if result_json else '""')
-    html = html.replace("__HIDE_DRAW_BTN__", "display:none" if hide_draw_btn else "")
-    html = html.replace("__MODE__", html_module.escape(mode_label))
-    mode_icon = "🥗" if mode_label == "减脂" else "🍟"
-    mode_color = "#2d8a7a" if mode_label == "减脂" else "#d35400"
-    html = html.replace("__MODE_ICON__", mode_icon)
-    html = html.replace("__MODE_COLOR__", mode_color)
-    html = html.replace("__BG_DIET__", html_module.escape(bg_diet))
-    html = html.replace("__COLOR_DIET__", html_module.escape(color_diet))
-    html = html.replace("__BG_INDULGE__", html_module.escape(bg_indulge))
-    html = html.replace("__COLOR_INDULGE__", html_module.escape(color_indulge))
-    return html
+        st.button("就吃这个", key="btn_confirm", use_container_width=True, on_click=_on_confirm_result, args=(r,))
+
+
+def render_records_io():
+    """本周总结页底部：导出全部记录 / 从 CSV、JSONL 导入记录。"""
+    with st.expander("导入 / 导出记录"):
+        fmt = st.radio("格式", FORMATS, horizontal=True, key="records_io_format")
+        if st.button("生成导出文件", key="btn_export_records"):
+            st.session_state.records_export = (fmt, "".join(iter_export(fmt, st.session_state.user_id)))
+        export = st.session_state.get("records_export")
+        if export:
+            export_fmt, data = export
+            st.download_button(
+                f"下载 records.{export_fmt}",
+                data=data.encode("utf-8"),
+                file_name=f"records.{export_fmt}",
+                mime="text/csv" if export_fmt == "csv" else "application/x-ndjson",
+                key="btn_download_records",
+            )
+        uploaded = st.file_uploader("导入记录（CSV 需含表头，字段同导出文件）", type=["csv", "jsonl"], key="records_import_file")
+        # 上传控件在后续 rerun 中仍保留文件，按 file_id 只导入一次
+        if uploaded is not None and st.session_state.get("records_imported_file") != uploaded.file_id:
+            st.session_state.records_imported_file = uploaded.file_id
+            try:
+                count = import_records(
+                    io.TextIOWrapper(uploaded, encoding="utf-8-sig", newline=""),
+                    guess_format(uploaded.name),
+                    st.session_state.user_id,
+                )
+            except ValueError as e:
+                st.error(f"导入失败，未写入任何记录：{e}")
+            else:
+                st.session_state.records_export = None
+                st.success(f"已导入 {count} 条记录")
 
 
-def main():
-    st.set_page_config(page_title="今天吃什么", page_icon="🍱", layout="centered", initial_sidebar_state="collapsed")
-    inject_css()
-    init_session()
+def _new_draw() -> tuple:
+    """
+    抽一次：只在本周剩余热量放得下的品类里抽（见 budget），其中最近几天吃过的降低概率（见 draw_history）。
+    删掉上一次的暂存结果，新结果按 tid 暂存（「就吃这个」/ 旧链接凭 tid 取回）。返回 (结果, tid)。
+    """
+    draw_store.delete(st.session_state.get("draw_tid_for_cleanup") or "")
+    mode = st.session_state.mode
+    user = st.session_state.user_id
+    candidates, calorie_cap = budget.table_for(mode, user)
+    table = draw_history.table_for(mode, user, candidates)
+    result = draw(mode, st.session_state.draw_rng, table, calorie_cap)
+    tid = str(uuid.uuid4())
+    draw_store.save(tid, result)
+    st.session_state.draw_tid = tid
+    st.session_state.draw_tid_for_cleanup = tid
+    return result, tid
+
+
+def _show_result(result: dict, tid: str) -> None:
+    st.session_state.result = result
+    st.session_state.show_modal = True
+    st.session_state.draw_tid_for_cleanup = tid
+    st.session_state.last_result_tid = tid
+    st.session_state.animating = False
+
+
+def _open_blank_record_form() -> None:
+    """首页「记录今日外卖金额」：按当前模式给默认热量。"""
+    default_cal = 250 if st.session_state.mode == "减脂" else 850
+    st.session_state.record_prefill = {
+        "菜品名": "外卖消费",
+        "热量": default_cal,
+        "模式": st.session_state.mode,
+        "品类": "其他",
+    }
+    st.session_state.show_record_form = True
+
+
+def _open_recap() -> None:
+    st.session_state.show_recap = True
+    st.session_state.recap_cursors = [None]
+
+
+# ---------- 按钮回调：Streamlit 在脚本运行前执行，改完状态后同一次运行直接渲染目标视图 ----------
+
+def _on_draw_again() -> None:
+    """「再抽一次」：关掉弹窗回到首页扭蛋机，播放新结果的摇晃、出球动画后在页面内弹出结果（与原先一致）。"""
+    result, tid = _new_draw()
+    st.session_state.show_modal = False
+    st.session_state.result = None
+    st.session_state.last_result_tid = None
+    st.session_state.gashapon_reply = {"id": tid, "result": _result_payload(result, tid), "play": True}
+
+
+def _on_confirm_result(r: dict) -> None:
+    draw_store.delete(st.session_state.get("draw_tid_for_cleanup") or "")
+    st.session_state.show_modal = False
+    st.session_state.draw_tid_for_cleanup = None
+    st.session_state.last_result_tid = None
+    st.session_state.show_record_form = True
+    st.session_state.record_prefill = {"菜品名": r["菜品名"], "热量": r["热量"], "模式": r["模式"], "品类": r["品类"]}
+
+
+def _set_user(uid: str) -> None:
+    """
+    记下浏览器带来的用户 ID。会话第一次拿到（或换了）ID 时，如果库里还只有升级前的旧记录（用户 为空串），
+    就把它们归到这个用户名下，升级后原来的历史记录不会从复盘里消失。
+    """
+    if not uid or not _USER_ID_RE.fullmatch(uid) or uid == st.session_state.user_id:
+        return
+    st.session_state.user_id = uid
+    claim_legacy_records(uid, only_if_unclaimed=True)
+
+
+def _on_claim_legacy() -> None:
+    claim_legacy_records(st.session_state.user_id)
+
+
+def _on_delete_record(rid) -> None:
+    delete_record(rid, st.session_state.user_id)
+    st.session_state.delete_confirm_id = None
+
+
+def _on_update_record(rid, 品类: str) -> None:
+    s = st.session_state
+    update_record(rid, s.edit_name, float(s.edit_amount), int(s.edit_calorie), s.edit_mode, 品类, s.user_id)
+    s.editing_record_id = None
+
 
+def _on_save_record() -> None:
+    s = st.session_state
+    pre = s.record_prefill
+    save_record(
+        菜品名=pre["菜品名"],
+        金额=float(s.record_amount),
+        热量=int(s.record_calorie),
+        模式=pre["模式"],
+        品类=pre["品类"],
+        用户=s.user_id,
+    )
+    budget.note_saved(s.user_id, int(s.record_calorie), float(s.record_amount))
+    s.show_record_form = False
+    s.record_prefill = None
+    s.success_message = True
+
+
+def _on_close_record_form() -> None:
+    st.session_state.show_record_form = False
+    st.session_state.record_prefill = None
+
+
+def _on_back_home() -> None:
+    st.session_state.show_recap = False
+    st.session_state.success_message = False
+    st.session_state.editing_record_id = None
+    st.session_state.delete_confirm_id = None
+    st.session_state.recap_cursors = [None]
+
+
+def _set_state(**values) -> None:
+    """通用回调：把若干会话状态设为给定值。"""
+    for k, v in values.items():
+        st.session_state[k] = v
+
+
+def _result_payload(result: dict, tid: str) -> dict:
+    """抽卡结果传给扭蛋机组件的部分：可 JSON 化的字段 + 图标 + tid（「就吃这个」凭它取回）。"""
+    payload = {k: v for k, v in result.items() if isinstance(v, (str, int, float, list)) or v is None}
+    icon = _food_icon(result)
+    if icon:
+        payload["foodIcon"] = icon
+    payload["tid"] = tid
+    return payload
+
+
+def _prefill_from_draw(cached: dict) -> None:
+    """用一次抽卡结果预填记录表单并进入记录页。"""
+    st.session_state.show_record_form = True
+    st.session_state.record_prefill = {
+        "菜品名": cached.get("菜品名") or "外卖消费",
+        "热量": int(cached.get("热量") or 0),
+        "模式": cached.get("模式") or st.session_state.mode,
+        "品类": cached.get("品类") or "其他",
+    }
+
+
+def _handle_gashapon_event(event: dict) -> None:
+    """
+    扭蛋机组件回传的事件，每个 id 只处理一次（组件值在之后的 rerun 里一直保留）：
+    draw → 抽卡并把结果放进下次渲染的 reply；record → 凭 tid 取回结果进入记录表单；
+    mode → 切换模式（页面已先行切换显示）；nav → 进入记录表单 / 本周总结。都在当前会话内完成，不重新加载页面。
+    """
+    event_id = event.get("id")
+    if not event_id or event_id == st.session_state.gashapon_event_id:
+        return
+    st.session_state.gashapon_event_id = event_id
+    _set_user(str(event.get("uid") or ""))
+    action = event.get("action")
+    if action == "draw":
+        result, tid = _new_draw()
+        st.session_state.gashapon_reply = {"id": event_id, "result": _result_payload(result, tid)}
+    elif action == "record":
+        cached = draw_store.load(str(event.get("tid") or ""))
+        if cached:
+            _prefill_from_draw(cached)
+    elif action == "mode":
+        if event.get("mode") in MODE_STYLES:
+            st.session_state.mode = event["mode"]
+    elif action == "nav":
+        if event.get("view") == "record":
+            _open_blank_record_form()
+        elif event.get("view") == "recap":
+            _open_recap()
+
+
+_QUERY_MODES = {"diet": "减脂", "indulge": "放纵"}
+
+
+def _route_query_params() -> None:
+    """
+    iframe / 旧链接通过查询参数带来的动作：本次运行开头解析一次、直接改会话状态，
+    同一次运行接着渲染目标视图，不再 st.rerun() 把整个脚本（CSS、图片地址等）再跑一遍。
+    - ?uid=       iframe 内跳转都带上 localStorage 里的 uid，记录与统计按用户隔离
+    - ?seed=      用给定种子重置本会话的抽卡随机数（重放一串抽卡），与当前种子相同时不重置
+    - ?mode=diet|indulge                       切换模式
+    - ?action=record / ?action=recap           首页底部「记录今日外卖金额」「查看本周总结」
+    - ?draw=1                                  旧链接：抽一次并显示结果弹窗（首页已改为组件内抽卡）
+    - ?record=1&tid=                           旧链接「就吃这个」：直接进入记录表单
+    - ?show_result=1&tid=                      旧动画页结束后的跳转：进入结果弹窗
+    有动作时处理完清空查询参数，刷新页面不会重复执行。
+    """
     q = st.query_params
-    if q.get("mode") == "diet":
-        st.session_state.mode = "减脂"
-        try:
-            st.query_params.clear()
-        except Exception:
-            pass
-        st.rerun()
-    if q.get("mode") == "indulge":
-        st.session_state.mode = "放纵"
-        try:
-            st.query_params.clear()
-        except Exception:
-            pass
-        st.rerun()
-
-    # iframe 内底部「记录今日外卖金额」点击 → ?action=record
-    if q.get("action") == "record":
-        default_cal = 250 if st.session_state.mode == "减脂" else 850
-        st.session_state.record_prefill = {
-            "菜品名": "外卖消费",
-            "热量": default_cal,
-            "模式": st.session_state.mode,
-            "品类": "其他",
-        }
-        st.session_state.show_record_form = True
-        try:
-            st.query_params.clear()
-        except Exception:
-            pass
-        st.rerun()
-    # iframe 内底部「查看本周总结」点击 → ?action=recap
-    if q.get("action") == "recap":
-        st.session_state.show_recap = True
-        try:
-            st.query_params.clear()
-        except Exception:
-            pass
-        st.rerun()
-
-    # 点击「点击抽取」链接会打开 ?draw=1：执行一次抽卡并展示新扭蛋动画（不跳转）
-    if q.get("draw") == "1":
-        result = draw(st.session_state.mode)
-        tid = str(uuid.uuid4())
-        _DRAW_CACHE[tid] = result
-        _save_draw_result(tid, result)
-        st.session_state["draw_tid"] = tid
-        st.session_state["draw_tid_for_cleanup"] = tid
-        st.session_state["gashapon_animate"] = (result, tid)
-        try:
-            st.query_params.pop("draw")
-        except Exception:
-            pass
-        st.rerun()
-
-    # 弹窗内「就吃这个」跳转 ?record=1&tid=xxx：直接进入记录表单，不再出现第二组结果页按钮
-    if q.get("record") == "1":
-        tid = (q.get("tid") or "").strip()
-        if tid:
-            cached = _DRAW_CACHE.pop(tid, None) or _load_draw_result(tid)
-            if cached:
-                st.session_state.show_record_form = True
-                st.session_state.record_prefill = {
-                    "菜品名": cached.get("菜品名") or "外卖消费",
-                    "热量": int(cached.get("热量") or 0),
-                    "模式": cached.get("模式") or st.session_state.mode,
-                    "品类": cached.get("品类") or "其他",
-                }
-                try:
-                    st.query_params.clear()
-                except Exception:
-                    pass
-                st.rerun()
+    _set_user((q.get("uid") or "").strip())
+    seed = (q.get("seed") or "").strip()
+    if seed.isdigit() and int(seed) != st.session_state.draw_seed:
+        _seed_draws(int(seed))
+    mode = _QUERY_MODES.get(q.get("mode") or "")
+    action = q.get("action")
+    tid = (q.get("tid") or "").strip()
+    draw_once = q.get("draw") == "1"
+    record = q.get("record") == "1"
+    show_result = q.get("show_result") == "1"
+    if not (mode or action or draw_once or record or show_result):
+        return
 
-    # 动画结束后跳转 ?show_result=1&tid=xxx（兼容旧链接，仍进入结果弹窗）
-    if q.get("show_result") == "1":
-        tid = (q.get("tid") or "").strip()
+    if mode:
+        st.session_state.mode = mode
+    if action == "record":
+        _open_blank_record_form()
+    elif action == "recap":
+        _open_recap()
+    if draw_once:
+        _show_result(*_new_draw())
+    if record and tid:
+        cached = draw_store.load(tid)
+        if cached:
+            _prefill_from_draw(cached)
+    if show_result:
         if tid and st.session_state.get("last_result_tid") == tid:
             st.session_state.animating = False
         else:
-            cached = _DRAW_CACHE.pop(tid, None) if tid else None
-            if cached is None and tid:
-                cached = _load_draw_result(tid)
+            cached = draw_store.load(tid)
             if cached is not None:
-                st.session_state.result = cached
-                st.session_state.show_modal = True
-                st.session_state.draw_tid_for_cleanup = tid
-                st.session_state.last_result_tid = tid
-                st.session_state.animating = False
-                st.rerun()
+                _show_result(cached, tid)
             else:
                 st.session_state.animating = False
+    try:
+        st.query_params.clear()
+    except Exception:
+        pass
+
+
+def main():
+    st.set_page_config(page_title="今天吃什么", page_icon="🍱", layout="centered", initial_sidebar_state="collapsed")
+    init_db()
+    inject_css()
+    init_session()
+
+    st.session_state.script_runs += 1
+    _route_query_params()
+    _handle_gashapon_event(st.session_state.get("gashapon") or {})
 
     inject_mode_modal()
 
@@ -533,41 +660,37 @@ def main():
             st.warning("确认删除该条记录？")
             c1, c2 = st.columns(2)
             with c1:
-                if st.button("确认删除", key="confirm_del"):
-                    delete_record(rid)
-                    st.session_state.delete_confirm_id = None
-                    st.rerun()
+                st.button("确认删除", key="confirm_del", on_click=_on_delete_record, args=(rid,))
             with c2:
-                if st.button("取消", key="cancel_del"):
-                    st.session_state.delete_confirm_id = None
-                    st.rerun()
+                st.button("取消", key="cancel_del", on_click=_set_state, kwargs={"delete_confirm_id": None})
             st.stop()
 
         # 正在编辑某条记录：显示编辑表单
         editing_id = st.session_state.get("editing_record_id")
         if editing_id:
-            rec = get_record_by_id(editing_id)
+            rec = get_record_by_id(editing_id, st.session_state.user_id)
             if rec:
                 st.markdown("**编辑本条记录**")
                 with st.form("edit_record_form"):
-                    name = st.text_input("菜品/说明", value=rec["菜品名"], key="edit_name")
-                    amount = st.number_input("金额（元）", value=float(rec["金额"]), min_value=0.0, step=0.1, format="%.1f", key="edit_amount")
-                    calorie = st.number_input("热量（千卡）", value=int(rec["热量"]), min_value=0, step=10, key="edit_calorie")
-                    mode = st.selectbox("模式", ["减脂", "放纵"], index=0 if rec["模式"] == "减脂" else 1, key="edit_mode")
-                    submitted = st.form_submit_button("保存修改")
-                    if submitted:
-                        update_record(editing_id, name, float(amount), int(calorie), mode, rec["品类"])
-                        st.session_state.editing_record_id = None
-                        st.rerun()
-                if st.button("取消编辑", key="cancel_edit"):
-                    st.session_state.editing_record_id = None
-                    st.rerun()
+                    st.text_input("菜品/说明", value=rec["菜品名"], key="edit_name")
+                    st.number_input("金额（元）", value=float(rec["金额"]), min_value=0.0, step=0.1, format="%.1f", key="edit_amount")
+                    st.number_input("热量（千卡）", value=int(rec["热量"]), min_value=0, step=10, key="edit_calorie")
+                    st.selectbox("模式", ["减脂", "放纵"], index=0 if rec["模式"] == "减脂" else 1, key="edit_mode")
+                    st.form_submit_button("保存修改", on_click=_on_update_record, args=(editing_id, rec["品类"]))
+                st.button("取消编辑", key="cancel_edit", on_click=_set_state, kwargs={"editing_record_id": None})
                 st.markdown("---")
             else:
                 st.session_state.editing_record_id = None
 
+        # 升级前没有用户 ID 的旧记录：库里已有别的用户时不会自动归属，由用户在这里认领
+        if st.session_state.user_id:
+            legacy = count_legacy_records()
+            if legacy:
+                st.info(f"有 {legacy} 条升级前的记录还没有归属，认领后会计入你的统计和明细。")
+                st.button("认领这些记录", key="claim_legacy", on_click=_on_claim_legacy)
+
         # 每次进入都从数据库重新查询并加总
-        stats = get_week_stats()
+        stats = get_week_stats(st.session_state.user_id)
         range_str = stats.get("统计范围", "")
         n = stats["总用餐次数"]
         st.markdown(
@@ -596,7 +719,8 @@ def main():
 
             # 本周记录明细：显示哪一天记录的，可编辑/删除
             st.markdown("**本周记录明细**")
-            records = get_week_records()
+            cursors = st.session_state.recap_cursors
+            records, next_cursor = get_records_page(cursors[-1], 用户=st.session_state.user_id)
             for rec in records:
                 try:
                     dt = rec["创建时间"][:10]  # 2025-02-16
@@ -609,27 +733,29 @@ def main():
                 with c1:
                     st.markdown(row)
                 with c2:
-                    if st.button("编辑", key=f"recap_edit_{rec['id']}"):
-                        st.session_state.editing_record_id = rec["id"]
-                        st.rerun()
+                    st.button("编辑", key=f"recap_edit_{rec['id']}", on_click=_set_state, kwargs={"editing_record_id": rec["id"]})
                 with c3:
-                    if st.button("删除", key=f"recap_del_{rec['id']}"):
-                        st.session_state.delete_confirm_id = rec["id"]
-                        st.rerun()
+                    st.button("删除", key=f"recap_del_{rec['id']}", on_click=_set_state, kwargs={"delete_confirm_id": rec["id"]})
                 st.markdown("")
+            if len(cursors) > 1 or next_cursor:
+                p1, p2, p3 = st.columns([1, 1, 1])
+                with p1:
+                    if len(cursors) > 1:
+                        st.button("上一页", key="recap_prev_page", on_click=_set_state, kwargs={"recap_cursors": cursors[:-1]})
+                with p2:
+                    st.markdown(f'<p style="text-align:center;color:#666;">第 {len(cursors)} 页</p>', unsafe_allow_html=True)
+                with p3:
+                    if next_cursor:
+                        st.button("下一页", key="recap_next_page", on_click=_set_state, kwargs={"recap_cursors": cursors + [next_cursor]})
+
+        render_records_io()
 
         st.markdown('<div class="wrap-black-btn">', unsafe_allow_html=True)
         col_back, col_refresh = st.columns(2)
         with col_back:
-            if st.button("返回首页", key="btn_back"):
-                st.session_state.show_recap = False
-                st.session_state.success_message = False
-                st.session_state.editing_record_id = None
-                st.session_state.delete_confirm_id = None
-                st.rerun()
+            st.button("返回首页", key="btn_back", on_click=_on_back_home)
         with col_refresh:
-            if st.button("刷新数据", key="btn_refresh_recap"):
-                st.rerun()
+            st.button("刷新数据", key="btn_refresh_recap")  # 点击本身就会重跑脚本并重新查询
         st.markdown('</div>', unsafe_allow_html=True)
         st.stop()
 
@@ -638,7 +764,7 @@ def main():
         pre = st.session_state.record_prefill
         st.markdown('<div class="record-form-page" style="display:none;" aria-hidden="true"></div>', unsafe_allow_html=True)
         st.subheader("记录外卖消费")
-        amount = st.number_input(
+        st.number_input(
             "请输入本次外卖金额（元）",
             min_value=0.0,
             max_value=9999.0,
@@ -646,41 +772,31 @@ def main():
             step=0.1,
             format="%.1f",
             help="≥0，最多 1 位小数",
+            key="record_amount",
         )
-        calorie = st.number_input(
+        st.number_input(
             "🔥 预估热量（千卡，可选）",
             min_value=0,
             max_value=5000,
             value=pre["热量"],
             step=10,
             help="减脂默认 150–350，放纵默认 500–1200，可改",
+            key="record_calorie",
         )
         save_class = "wrap-save-record-diet" if pre["模式"] == "减脂" else "wrap-save-record-indulge"
         st.markdown(f'<div class="{save_class}" style="display:none;"></div>', unsafe_allow_html=True)
         col_save, col_cancel = st.columns(2)
         with col_save:
-            if st.button("保存记录", key="btn_save", use_container_width=True):
-                if amount < 0:
-                    st.error("请输入有效的金额（≥0，最多 1 位小数）")
-                else:
-                    save_record(菜品名=pre["菜品名"], 金额=float(amount), 热量=int(calorie), 模式=pre["模式"], 品类=pre["品类"])
-                    st.session_state.show_record_form = False
-                    st.session_state.record_prefill = None
-                    st.session_state.success_message = True
-                    st.rerun()
+            # 金额输入框已限制 min_value=0，回调里不再另做校验
+            st.button("保存记录", key="btn_save", use_container_width=True, on_click=_on_save_record)
         with col_cancel:
-            if st.button("取消", key="btn_cancel_record", use_container_width=True):
-                st.session_state.show_record_form = False
-                st.session_state.record_prefill = None
-                st.rerun()
+            st.button("取消", key="btn_cancel_record", use_container_width=True, on_click=_on_close_record_form)
         st.stop()
 
     if st.session_state.get("success_message"):
         st.markdown("<p style='text-align:center;font-size:1.2rem;font-weight:700;color:#000;'>记录成功</p>", unsafe_allow_html=True)
         st.markdown('<div class="wrap-black-btn">', unsafe_allow_html=True)
-        if st.button("返回首页", key="btn_home_after_save"):
-            st.session_state.success_message = False
-            st.rerun()
+        st.button("返回首页", key="btn_home_after_save", on_click=_set_state, kwargs={"success_message": False})
         st.markdown('</div>', unsafe_allow_html=True)
         st.stop()
 
@@ -690,43 +806,28 @@ def main():
         render_result_modal(r, r["模式"] == "减脂")
         st.stop()
 
-    # 扭蛋动画中（有 draw_tid 即播动画，2 秒后跳转；结果由文件/内存缓存取回）
+    # 扭蛋动画中（有 draw_tid 即播动画，2 秒后跳转；结果由内存缓存/数据库暂存取回）
     if st.session_state.get("animating"):
         tid = st.session_state.get("draw_tid") or ""
         if tid:
             render_gashapon_animation_page(tid)
-        else:
-            st.session_state.animating = False
-            st.rerun()
-        st.stop()
+            st.stop()
+        st.session_state.animating = False
 
     # 首页：只渲染一个 iframe，整页（标题+模式+扭蛋+底部记录/查看）全在 iframe 内，绝不追加任何 Streamlit 按钮
-    mode = st.session_state.mode
-    bg_diet = TEAL if mode == "减脂" else BUTTON_GRAY
-    color_diet = "#fff" if mode == "减脂" else GRAY_TEXT
-    bg_indulge = RED if mode == "放纵" else BUTTON_GRAY
-    color_indulge = "#fff" if mode == "放纵" else GRAY_TEXT
-    animate_data = st.session_state.pop("gashapon_animate", None)
-    machine_src = _asset_data_uri("machine.png") or _asset_data_uri("gashapon.png")
-    ball_src = _asset_data_uri("ball.png")
-    ball_left_src = _asset_data_uri("ball-left.png") or ball_src
-    ball_right_src = _asset_data_uri("ball-right.png") or ball_src
-    if animate_data:
-        result, tid = animate_data
-        food_icon_src = ""
-        if result:
-            for name in (result.get("品类") or "", result.get("菜品名") or ""):
-                if name:
-                    food_icon_src = _asset_data_uri(f"food-icons/{name}.png")
-                    if food_icon_src:
-                        break
-            if not food_icon_src:
-                food_icon_src = _asset_data_uri("food-icons/sprite.png") or ""
-        gashapon_html = _gashapon_html("animate", result=result, tid=tid, machine_src=machine_src or "", ball_src=ball_src or "", ball_left_src=ball_left_src or "", ball_right_src=ball_right_src or "", food_icon_src=food_icon_src, hide_draw_btn=False, mode_label=mode, bg_diet=bg_diet, color_diet=color_diet, bg_indulge=bg_indulge, color_indulge=color_indulge)
-    else:
-        gashapon_html = _gashapon_html("idle", machine_src=machine_src or "", ball_src=ball_src or "", ball_left_src=ball_left_src or "", ball_right_src=ball_right_src or "", hide_draw_btn=False, mode_label=mode, bg_diet=bg_diet, color_diet=color_diet, bg_indulge=bg_indulge, color_indulge=color_indulge)
-
-    st.components.v1.html(gashapon_html, height=800, scrolling=False)
+    machine_src = _asset_src("machine.png", MACHINE_PX) or _asset_src("gashapon.png", MACHINE_PX)
+    ball_src = _asset_src("ball.png", BALL_PX)
+    ball_left_src = _asset_src("ball-left.png", BALL_PX) or ball_src
+    ball_right_src = _asset_src("ball-right.png", BALL_PX) or ball_src
+    if not publish_frontend(machine_src or "", ball_src or "", ball_left_src or "", ball_right_src or ""):
+        st.error("扭蛋机模板未找到")
+        st.stop()
+    # 抽卡在组件内完成：页面回传 draw 事件 → 本次运行开头已抽好 → 结果随 reply 参数送回页面播放
+    # 「再抽一次」的结果只送一次：之后首页重新挂载组件时不再重播
+    reply = st.session_state.gashapon_reply
+    if reply and reply.get("play"):
+        st.session_state.gashapon_reply = None
+    gashapon(st.session_state.mode, MODE_STYLES, MODE_IDLE, reply=reply, height=800, key="gashapon")
 
 
 if __name__ == "__main__":
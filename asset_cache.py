@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+图片（assets/ 下的原图或 asset_pipeline 生成的变体）的两种引用方式，都按文件路径调用：
+- data URI：按 (路径, mtime) 缓存已编码的字符串，总大小超出预算时淘汰最久未用的；
+- 静态 URL：按内容哈希复制到 static/assets/，由 Streamlit 静态文件服务（enableStaticServing）提供，
+  文件名随内容变化，浏览器可放心长期缓存，每次渲染只需传几十字节的地址。
+Streamlit 每次 rerun 都会重新执行 app.py，但被导入的模块只加载一次，所以缓存放在这里随进程常驻。
+"""
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+# Streamlit 把脚本同级的 static/ 目录映射到 app/static/（需开启 server.enableStaticServing）
+STATIC_DIR = Path(__file__).resolve().parent / "static" / "assets"
+STATIC_URL = "app/static/assets"
+
+# 缓存上限（按 data URI 字符数计，约等于字节数）；首页常用图片编码后合计约 1.5 MB
+CACHE_BUDGET = 16 * 1024 * 1024
+
+_MIME = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp"}
+
+
+def _encode(path: Path) -> Optional[str]:
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return None
+    mime = _MIME.get(path.suffix.lower(), "image/png")
+    return f"data:{mime};base64,{base64.b64encode(raw).decode('ascii')}"
+
+
+class AssetCache:
+    """按路径缓存 (mtime, data URI)；文件被替换（mtime 变化）时自动重新编码。线程安全。"""
+
+    def __init__(self, budget: int):
+        self._budget = budget
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: Path) -> Optional[str]:
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        uri = _encode(path)
+        if uri is None:
+            return None
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._size -= len(old[1])
+            if len(uri) <= self._budget:
+                self._entries[path] = (mtime, uri)
+                self._size += len(uri)
+                while self._size > self._budget:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+                    self.evictions += 1
+        return uri
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+
+_cache = AssetCache(CACHE_BUDGET)
+
+
+def path_data_uri(path: Path) -> Optional[str]:
+    """将图片（assets 下的原图或 asset_pipeline 生成的变体）读为 data URI（带缓存），便于嵌入 HTML 无需静态服务；文件不存在返回 None。"""
+    return _cache.get(path)
+
+
+def cache_stats() -> dict:
+    """命中 / 未命中 / 淘汰次数，以及当前条目数与占用大小。"""
+    return _cache.stats()
+
+
+_published = {}
+_publish_lock = threading.Lock()
+
+
+def _publish(path: Path) -> str:
+    """把文件按内容哈希复制到 static/assets/（已存在则跳过），返回文件名。"""
+    raw = path.read_bytes()
+    name = f"{path.stem}.{hashlib.sha256(raw).hexdigest()[:12]}{path.suffix.lower()}"
+    target = STATIC_DIR / name
+    if not target.exists():
+        STATIC_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{name}.{os.getpid()}.tmp")
+        tmp.write_bytes(raw)
+        os.replace(tmp, target)
+    return name
+
+
+def path_url(path: Path) -> Optional[str]:
+    """
+    图片（assets 下的原图或 asset_pipeline 生成的变体）的静态 URL（相对页面地址，如 app/static/assets/machine.1a2b3c4d5e6f.png）；
+    文件不存在返回 None。同一 (路径, mtime) 只哈希、复制一次。
+    """
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    key = str(path)
+    with _publish_lock:
+        entry = _published.get(key)
+        if entry is None or entry[0] != mtime:
+            try:
+                entry = (mtime, _publish(path))
+            except OSError:
+                return None
+            _published[key] = entry
+    return f"{STATIC_URL}/{entry[1]}"
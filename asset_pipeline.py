@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+图片构建：把 assets/ 下的 PNG 转成 WebP 与若干缩小尺寸（PNG / WebP 各一份），写入 build/assets/，
+并生成 manifest.json 记录每个变体的尺寸、字节数与 sha256。多张图在进程池里并行处理，源文件未变的跳过。
+同时把 food-icons/ 下的单品类图标与 sprite.png 的 8 格拼成食物图标图集（见 icon_atlas）。
+页面渲染时用 pick_variant() 取「宽度够用」的变体中最小的一个；没构建过或源文件已改动时退回原图。
+构建需要 Pillow（Streamlit 已依赖它）；运行时只读 manifest（图片尺寸用 image_size()），不需要 Pillow。
+命令行用法：
+    python asset_pipeline.py            # 增量构建
+    python asset_pipeline.py --force    # 全部重建
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+ASSETS = Path(__file__).resolve().parent / "assets"
+BUILD_DIR = Path(__file__).resolve().parent / "build" / "assets"
+MANIFEST = BUILD_DIR / "manifest.json"
+
+# 缩小后的目标宽度（px）；不超过原图宽度，原尺寸另出一份 WebP
+VARIANT_WIDTHS = (128, 256, 512)
+WEBP_QUALITY = 82
+
+# 页面上各图片的最大显示宽度（CSS px）× 2 倍屏：app.py 按它选变体，main() 按它统计每页发送的字节数
+MACHINE_PX = 500
+BALL_PX = 104
+FOOD_ICON_PX = 128
+# 首页扭蛋机组件加载的图片（抽卡结果弹窗在同一组件里，另加一个食物图标）
+HOME_IMAGES = (("machine.png", MACHINE_PX), ("ball.png", BALL_PX), ("ball-left.png", BALL_PX), ("ball-right.png", BALL_PX))
+
+
+def _sha256(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _source_key(path: Path) -> dict:
+    st = path.stat()
+    return {"mtime_ns": st.st_mtime_ns, "bytes": st.st_size}
+
+
+def _build_one(relative_path: str) -> dict:
+    """处理一张图（在子进程中运行），返回其 manifest 条目。"""
+    from PIL import Image
+
+    src = ASSETS / relative_path
+    raw = src.read_bytes()
+    entry = dict(_source_key(src), sha256=_sha256(raw), variants=[])
+    with Image.open(src) as im:
+        im.load()
+        entry["width"], entry["height"] = im.size
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA")
+        widths = [w for w in VARIANT_WIDTHS if w < im.width] + [im.width]
+        out_dir = BUILD_DIR / Path(relative_path).parent
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(relative_path).stem
+        for w in widths:
+            h = max(1, round(im.height * w / im.width))
+            scaled = im if w == im.width else im.resize((w, h), Image.LANCZOS)
+            for fmt, ext, opts in (("webp", ".webp", {"quality": WEBP_QUALITY, "method": 6}), ("png", ".png", {"optimize": True})):
+                if fmt == "png" and w == im.width:
+                    continue  # 原尺寸 PNG 就是源文件
+                target = out_dir / f"{stem}.{w}w{ext}"
+                scaled.save(target, fmt.upper(), **opts)
+                data = target.read_bytes()
+                entry["variants"].append({
+                    "file": target.relative_to(BUILD_DIR).as_posix(),
+                    "format": fmt,
+                    "width": w,
+                    "height": h,
+                    "bytes": len(data),
+                    "sha256": _sha256(data),
+                })
+    return entry
+
+
+def _sources() -> List[str]:
+    return sorted(p.relative_to(ASSETS).as_posix() for p in ASSETS.rglob("*.png"))
+
+
+def _read_manifest() -> dict:
+    try:
+        return json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _source_unchanged(relative_path: str, entry: dict) -> bool:
+    """manifest 条目是否仍对应当前源文件（按 mtime 与大小判断，不重新哈希）。"""
+    try:
+        return _source_key(ASSETS / relative_path) == {"mtime_ns": entry.get("mtime_ns"), "bytes": entry.get("bytes")}
+    except OSError:
+        return False
+
+
+def _up_to_date(relative_path: str, entry: Optional[dict]) -> bool:
+    if not entry or not _source_unchanged(relative_path, entry):
+        return False
+    return all((BUILD_DIR / v["file"]).exists() for v in entry["variants"])
+
+
+def build_atlas() -> dict:
+    """
+    把 food-icons/ 下的单品类图标（按文件名，不含扩展名）与 sprite.png 的 8 格（名为 sprite:格名）统一缩放成
+    icon_atlas.TILE 见方，拼成 icon_atlas.ATLAS_IMAGE，偏移与整图尺寸写入 icon_atlas.ATLAS_MANIFEST，返回该 manifest。
+    """
+    from PIL import Image
+
+    import icon_atlas  # 只在构建时用到；icon_atlas 运行时反过来读本模块的 manifest
+
+    tile_px = icon_atlas.TILE
+    tiles = []  # (名字, 缩放后的图块)
+    for path in sorted(icon_atlas.FOOD_ICONS.glob("*.png")):
+        if path != icon_atlas.SPRITE:
+            with Image.open(path) as im:
+                tiles.append((path.stem, im.convert("RGBA").resize((tile_px, tile_px), Image.LANCZOS)))
+    if icon_atlas.SPRITE.exists():
+        with Image.open(icon_atlas.SPRITE) as sprite:
+            sprite = sprite.convert("RGBA")
+            for cell, (x, y, side) in icon_atlas.SPRITE_CELLS.items():
+                tile = sprite.crop((x, y, x + side, y + side)).resize((tile_px, tile_px), Image.LANCZOS)
+                tiles.append((f"sprite:{cell}", tile))
+    if not tiles:
+        raise FileNotFoundError(f"{icon_atlas.FOOD_ICONS} 下没有可用的图标")
+
+    cols = math.ceil(math.sqrt(len(tiles)))
+    rows = math.ceil(len(tiles) / cols)
+    atlas = Image.new("RGBA", (cols * tile_px, rows * tile_px), (255, 255, 255, 0))
+    offsets = {}
+    for i, (name, tile) in enumerate(tiles):
+        x, y = (i % cols) * tile_px, (i // cols) * tile_px
+        atlas.paste(tile, (x, y))
+        offsets[name] = [x, y, tile_px, tile_px]
+
+    icon_atlas.ATLAS_DIR.mkdir(parents=True, exist_ok=True)
+    atlas.save(icon_atlas.ATLAS_IMAGE, "WEBP", quality=85, method=6)
+    manifest = {"image": icon_atlas.ATLAS_IMAGE.name, "size": list(atlas.size), "tile": tile_px, "icons": offsets}
+    tmp = icon_atlas.ATLAS_MANIFEST.with_name(f".atlas.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, icon_atlas.ATLAS_MANIFEST)
+    return manifest
+
+
+def _atlas_stale(changed: List[str]) -> bool:
+    from icon_atlas import ATLAS_IMAGE, ATLAS_MANIFEST
+
+    return any(p.startswith("food-icons/") for p in changed) or not (ATLAS_MANIFEST.exists() and ATLAS_IMAGE.exists())
+
+
+def build(force: bool = False, workers: Optional[int] = None) -> dict:
+    """增量构建全部图片并写 manifest，食物图标有变化（或没建过）时重建图集；返回新的 manifest（源相对路径 → 条目）。"""
+    old = {} if force else _read_manifest()
+    sources = _sources()
+    todo = [p for p in sources if not _up_to_date(p, old.get(p))]
+    manifest = {p: old[p] for p in sources if p not in todo}
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, entry in zip(todo, pool.map(_build_one, todo)):
+                manifest[path] = entry
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST.with_name(f".manifest.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, MANIFEST)
+    if force or _atlas_stale(todo):
+        try:
+            build_atlas()
+        except FileNotFoundError:
+            pass  # 没有任何食物图标：结果卡片不显示图标
+    return manifest
+
+
+_loaded = (None, {})
+_loaded_lock = threading.Lock()
+
+
+def _manifest() -> dict:
+    """运行时读取 manifest，按 mtime 复用；不存在时为空（全部用原图）。"""
+    global _loaded
+    try:
+        mtime = MANIFEST.stat().st_mtime_ns
+    except OSError:
+        return {}
+    with _loaded_lock:
+        if _loaded[0] != mtime:
+            _loaded = (mtime, _read_manifest())
+        return _loaded[1]
+
+
+def _header_size(path: Path) -> Optional[Tuple[int, int]]:
+    """
+    从文件头读宽高，不解码图片：PNG 读 IHDR；JPEG（assets 里有些 .png 实为 JPEG）找第一个 SOF 段。
+    其他格式或读不到时返回 None。
+    """
+    try:
+        with open(path, "rb") as fp:
+            head = fp.read(24)
+            if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:2] != b"\xff\xd8":
+                return None
+            fp.seek(2)
+            while True:
+                marker = fp.read(4)
+                if len(marker) < 4 or marker[0] != 0xFF:
+                    return None
+                length = struct.unpack(">H", marker[2:])[0]
+                # SOF0–SOF15，除去 DHT(C4) / JPG(C8) / DAC(CC)
+                if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack(">xHH", fp.read(5))
+                    return width, height
+                fp.seek(length - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def image_size(relative_path: str) -> Optional[Tuple[int, int]]:
+    """
+    assets 下某张图的 (宽, 高)：优先取构建时写进 manifest 的尺寸；未构建或源文件已改动时读文件头。
+    文件不存在返回 None。运行时不需要 Pillow。
+    """
+    entry = _manifest().get(relative_path)
+    if entry and "width" in entry and _source_unchanged(relative_path, entry):
+        return entry["width"], entry["height"]
+    return _header_size(ASSETS / relative_path)
+
+
+def pick_variant(relative_path: str, min_width: int) -> Path:
+    """
+    assets 下某张图在显示宽度（含高分屏倍数）至少 min_width px 时应发送的文件：
+    宽度够用的变体里字节数最小的一个，没有够宽的就用最宽的；未构建或源文件已改动时返回原图路径。
+    """
+    src = ASSETS / relative_path
+    entry = _manifest().get(relative_path)
+    if not entry or not _source_unchanged(relative_path, entry):
+        return src
+    candidates = [v for v in entry["variants"] if v["width"] >= min_width]
+    if not candidates:
+        widest = max(v["width"] for v in entry["variants"])
+        candidates = [v for v in entry["variants"] if v["width"] == widest]
+    best = min(candidates, key=lambda v: v["bytes"])
+    if best["bytes"] >= entry["bytes"]:
+        return src
+    path = BUILD_DIR / best["file"]
+    return path if path.exists() else src
+
+
+def _file_bytes(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def page_bytes() -> dict:
+    """
+    每个页面加载的图片字节数：页面 → (全用原图, 按显示宽度选变体后实际发送)。
+    首页为扭蛋机与扭蛋图；抽卡结果另加一个食物图标（原来整张发送 sprite.png，现在发图集或 sprite 的缩小变体）；
+    本周总结不加载图片。
+    """
+    import icon_atlas
+
+    home = [0, 0]
+    for relative_path, width in HOME_IMAGES:
+        home[0] += _file_bytes(ASSETS / relative_path)
+        home[1] += _file_bytes(pick_variant(relative_path, width))
+    icon_sent = 0
+    tile = next(iter(icon_atlas.icon_index().values()), None)
+    if tile is not None:
+        try:
+            relative_path = tile.path.relative_to(ASSETS).as_posix()
+        except ValueError:
+            icon_sent = _file_bytes(tile.path)
+        else:
+            icon_sent = _file_bytes(pick_variant(relative_path, tile.sheet_width(FOOD_ICON_PX)))
+    icon_src = _file_bytes(icon_atlas.SPRITE) if tile is not None else 0
+    return {"首页": tuple(home), "抽卡结果": (home[0] + icon_src, home[1] + icon_sent), "本周总结": (0, 0)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="生成 assets/ 图片的 WebP 与缩小尺寸变体")
+    parser.add_argument("--force", action="store_true", help="忽略已有 manifest，全部重建")
+    parser.add_argument("--workers", type=int, help="进程数，默认 CPU 核数")
+    args = parser.parse_args(argv)
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("需要 Pillow：pip install pillow", file=sys.stderr)
+        return 1
+    manifest = build(force=args.force, workers=args.workers)
+    total_src = total_best = 0
+    for path, entry in sorted(manifest.items()):
+        best = min(v["bytes"] for v in entry["variants"] if v["width"] == entry["width"])
+        total_src += entry["bytes"]
+        total_best += min(best, entry["bytes"])
+        print(f"{path:32s} {entry['bytes']:>9,} B -> 原尺寸 WebP {best:>9,} B，变体 {len(entry['variants'])} 个")
+    print(f"原尺寸合计 {total_src:,} B -> {total_best:,} B（不含按显示宽度缩小）；manifest: {MANIFEST}", file=sys.stderr)
+    from icon_atlas import ATLAS_IMAGE, ATLAS_MANIFEST
+
+    try:
+        atlas = json.loads(ATLAS_MANIFEST.read_text(encoding="utf-8"))
+        print(f"食物图标图集 {ATLAS_IMAGE}（{atlas['size'][0]}×{atlas['size'][1]}，{len(atlas['icons'])} 格，"
+              f"{ATLAS_IMAGE.stat().st_size:,} B）", file=sys.stderr)
+    except (OSError, ValueError, KeyError):
+        pass
+    print("每页图片字节数（原图 -> 按显示宽度实际发送）：")
+    for page, (src, sent) in page_bytes().items():
+        if not src:
+            print(f"  {page}：无图片")
+            continue
+        print(f"  {page}：{src:,} B -> {sent:,} B，省 {src - sent:,} B（-{(src - sent) / src:.1%}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+压测：n 个进程同时读写同一个数据库（一半写入记录，一半读周统计与明细分页），
+统计 database is locked 等错误数、最终行数与耗时。模拟多个 Streamlit 实例共用一个库。
+在临时目录建库，不碰 data/records.db：
+    python bench/db_concurrency.py [-p 50] [-n 400]
+"""
+import argparse
+import multiprocessing as mp
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import db  # noqa: E402
+
+
+def _worker(kind: str, n: int, path: str, queue) -> None:
+    db.DB_PATH = Path(path)
+    errors = 0
+    for i in range(n):
+        try:
+            if kind == "write":
+                db.save_record("压测", 1.0, 100, "减脂", "日料", f"u{i % 10}")
+            else:
+                db.get_week_stats(f"u{i % 10}")
+                db.get_records_page(用户=f"u{i % 10}")
+        except sqlite3.OperationalError:
+            errors += 1
+    db.close_db()
+    queue.put((kind, errors))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-p", type=int, default=50, help="进程数（一半写、一半读）")
+    parser.add_argument("-n", type=int, default=400, help="每个进程的操作次数")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "records.db")
+        db.DB_PATH = Path(path)
+        db.init_db()
+        db.close_db()
+        queue = mp.Queue()
+        kinds = ["write" if i % 2 == 0 else "read" for i in range(args.p)]
+        procs = [mp.Process(target=_worker, args=(kind, args.n, path, queue)) for kind in kinds]
+        t = time.perf_counter()
+        for p in procs:
+            p.start()
+        results = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - t
+        conn = sqlite3.connect(path)
+        rows = conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        conn.close()
+        db.DB_PATH = Path(path)
+        drift = db.check_weekly_summary()
+        db.close_db()
+
+    writers = kinds.count("write")
+    write_errors = sum(e for kind, e in results if kind == "write")
+    read_errors = sum(e for kind, e in results if kind == "read")
+    print(f"{args.p} 个进程 × {args.n} 次操作，{elapsed:.1f} s")
+    print(f"  写入出错 {write_errors}，读取出错 {read_errors}")
+    print(f"  记录 {rows:,} / {writers * args.n:,} 条，周汇总与明细{'一致' if not drift else '不一致'}")
+    return 0 if not (write_errors or read_errors or drift) and rows == writers * args.n else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
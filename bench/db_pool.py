@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+基准：连接池 vs 每次调用新建连接（按 id 取一条记录）。
+在临时目录建库，不碰 data/records.db：
+    python bench/db_pool.py [-n 5000]
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import db  # noqa: E402
+
+
+def _connect_per_call(record_id: int) -> dict:
+    """连接池之前的做法：每次调用先建连确认表结构，再建连查询，用完即关。"""
+    conn = sqlite3.connect(str(db.DB_PATH))
+    conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'records'").fetchall()
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(str(db.DB_PATH))
+    conn.row_factory = sqlite3.Row
+    row = conn.execute(
+        "SELECT id, 菜品名, 金额, 热量, 模式, 品类, 创建时间, 区间 FROM records WHERE id = ?", (record_id,)
+    ).fetchone()
+    conn.close()
+    return dict(row)
+
+
+def _rate(fn, n: int) -> float:
+    t = time.perf_counter()
+    for _ in range(n):
+        fn(1)
+    return n / (time.perf_counter() - t)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=5000, help="每种方式的调用次数")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "records.db"
+        db.save_record("基准", 10.0, 300, "减脂", "日料")
+        per_call = _rate(_connect_per_call, args.n)
+        pooled = _rate(db.get_record_by_id, args.n)
+        db.close_db()
+    print(f"get_record_by_id × {args.n}")
+    print(f"  每次新建连接  {per_call:>9,.0f} 次/秒")
+    print(f"  连接池        {pooled:>9,.0f} 次/秒  ({pooled / per_call:.1f}×)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
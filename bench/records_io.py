@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+基准：records_io 流式导入 / 导出 n 条记录（JSONL 导入、CSV 导出）的耗时与进程峰值内存。
+在临时目录建库与数据文件，不碰 data/records.db：
+    python bench/records_io.py [-n 1000000]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import db  # noqa: E402
+import records_io  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource，不报峰值内存
+    resource = None
+
+
+def _max_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _write_jsonl(path: Path, n: int) -> None:
+    t0 = datetime(2020, 1, 1)
+    with open(path, "w", encoding="utf-8") as fp:
+        for i in range(n):
+            rec = {
+                "菜品名": f"基准{i % 97}", "金额": 10 + i % 50, "热量": 300 + i % 700,
+                "模式": "减脂" if i % 3 else "放纵", "品类": f"品类{i % 30}",
+                "创建时间": (t0 + timedelta(minutes=7 * i)).strftime("%Y-%m-%d %H:%M:%S"), "用户": f"u{i % 20}",
+            }
+            fp.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=100_000, help="记录条数")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source, target = tmp / "records.jsonl", tmp / "records.csv"
+        _write_jsonl(source, args.n)
+        db.DB_PATH = tmp / "records.db"
+        db.init_db()
+        rss_before = _max_rss_mb()
+
+        t = time.perf_counter()
+        with open(source, encoding="utf-8") as fp:
+            count = records_io.import_records(fp, "jsonl")
+        imported = time.perf_counter() - t
+        rss_import = _max_rss_mb()
+
+        t = time.perf_counter()
+        with open(target, "w", encoding="utf-8", newline="") as fp:
+            records_io.export_records(fp, "csv")
+        exported = time.perf_counter() - t
+        rss_export = _max_rss_mb()
+
+        drift = db.check_weekly_summary()
+        db.close_db()
+
+    print(f"{count:,} 条记录（建库后进程峰值内存 {rss_before:.0f} MB）")
+    print(f"  导入 JSONL  {imported:7.1f} s  {count / imported:>9,.0f} 条/秒  峰值内存 {rss_import:.0f} MB")
+    print(f"  导出 CSV    {exported:7.1f} s  {count / exported:>9,.0f} 条/秒  峰值内存 {rss_export:.0f} MB")
+    print(f"  周汇总与明细{'一致' if not drift else f'有 {len(drift)} 处不一致'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+预算模式：本周已吃的热量 / 已花的钱超过目标后，只从热量区间放得进剩余热量的品类里抽，抽出的热量也不超过剩余。
+- 本周累计按用户缓存：第一次用到时读一次 get_week_stats（weekly_summary 主键查询），之后本进程保存记录时
+  由 note_saved() 直接累加；别的增删改（db.records_generation 对不上）、跨周或 CACHE_TTL 秒后才重新读取。
+- 候选集按热量下限预分档（config.foods.calorie_buckets），剩余热量二分到档位，不逐个筛品类。
+菜品库没有价格，消费目标无法按品类筛选：本周花销达到目标时按热量预算已用完处理，只抽最清淡的一档。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from config.foods import calorie_buckets
+from config.sampling import AliasTable
+from db import get_week_stats, records_generation
+
+# 每周外卖热量目标（kcal），默认 0 关闭预算模式（抽卡与原先一致），如 7000 开启
+WEEKLY_CALORIE_TARGET = int(os.environ.get("WAIMAI_WEEKLY_KCAL", "0"))
+# 每周外卖消费目标（元），0 不限
+WEEKLY_SPEND_TARGET = float(os.environ.get("WAIMAI_WEEKLY_SPEND", "0"))
+CACHE_TTL = 300
+# 进程内最多缓存的用户数
+CACHE_SIZE = 1024
+
+
+class _Totals:
+    __slots__ = ("generation", "week", "expires", "calories", "spend")
+
+    def __init__(self, generation: int, week: date, expires: float, calories: int, spend: float):
+        self.generation = generation
+        self.week = week
+        self.expires = expires
+        self.calories = calories
+        self.spend = spend
+
+
+_totals = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "loads": 0, "increments": 0}
+
+
+def _week() -> date:
+    today = date.today()
+    return today - timedelta(days=today.weekday())
+
+
+def _put(用户: str, totals: _Totals) -> None:
+    _totals[用户] = totals
+    _totals.move_to_end(用户)
+    while len(_totals) > CACHE_SIZE:
+        _totals.popitem(last=False)
+
+
+def week_totals(用户: str = "") -> Tuple[int, float]:
+    """该用户本周已记录的 (热量, 消费)。"""
+    week = _week()
+    now = time.time()
+    generation = records_generation()
+    with _lock:
+        totals = _totals.get(用户)
+        if totals is not None and totals.generation == generation and totals.week == week and totals.expires > now:
+            _totals.move_to_end(用户)
+            _stats["hits"] += 1
+            return totals.calories, totals.spend
+        _stats["loads"] += 1
+    stats = get_week_stats(用户)
+    totals = _Totals(generation, week, now + CACHE_TTL, int(stats["总热量"]), float(stats["总消费"]))
+    with _lock:
+        _put(用户, totals)
+    return totals.calories, totals.spend
+
+
+def note_saved(用户: str, 热量: int, 金额: float) -> None:
+    """
+    本进程刚用 db.save_record 存了一条本周记录：把它加进缓存的本周累计，不重新查询。
+    缓存与保存前的数据不是同一代（期间还有别的写入）时改为丢弃缓存，下次重新读取。
+    """
+    generation = records_generation()
+    with _lock:
+        totals = _totals.get(用户)
+        if totals is None:
+            return
+        if totals.generation == generation - 1 and totals.week == _week():
+            totals.calories += int(热量)
+            totals.spend += float(金额)
+            totals.generation = generation
+            _stats["increments"] += 1
+        else:
+            del _totals[用户]
+
+
+def remaining(用户: str = "") -> Optional[int]:
+    """本周剩余热量；预算模式关闭时为 None（不限），消费已达目标时为 0。"""
+    if WEEKLY_CALORIE_TARGET <= 0 and WEEKLY_SPEND_TARGET <= 0:
+        return None
+    calories, spend = week_totals(用户)
+    if WEEKLY_SPEND_TARGET > 0 and spend >= WEEKLY_SPEND_TARGET:
+        return 0
+    if WEEKLY_CALORIE_TARGET <= 0:
+        return None
+    return max(0, WEEKLY_CALORIE_TARGET - calories)
+
+
+def table_for(mode: str, 用户: str = "") -> Tuple[AliasTable, Optional[int]]:
+    """(该用户剩余预算下可抽品类的别名表, 热量上限)；不限预算时为 (该模式全部品类, None)。"""
+    budget = remaining(用户)
+    return calorie_buckets(mode).table(budget), budget
+
+
+def clear() -> None:
+    with _lock:
+        _totals.clear()
+
+
+def stats() -> dict:
+    """缓存命中、从数据库读取与保存时累加的次数，以及缓存用户数。"""
+    with _lock:
+        return dict(_stats, users=len(_totals))
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+菜品库：从数据文件（默认 config/foods.json，环境变量 WAIMAI_FOODS_FILE 可换）读入紧凑的只读记录。
+- 每个品类一条 FoodEntry（NamedTuple，无实例 __dict__），品类 / 分类 / 搭配等字符串 sys.intern，
+  相同的注意事项元组与热量区间只存一份；上万家本地餐厅也只占几 MB。
+- 首次抽卡时才读文件；之后每 CHECK_INTERVAL 秒最多 stat 一次，mtime / 大小变了就重新读入并整体替换引用，
+  不用重启 Streamlit。新文件格式有误时继续用旧的菜品库，错误见 stats()["error"]。
+文件格式见 config/foods.json：{模式: {"默认热量", "分类热量"?, "默认快乐提示"?, "菜品": [{"品类", "搭配", …}]}}；
+菜品可带 "图标"（icon_atlas.SPRITE_CELLS 里的一格，如 "饭团"），没有单独图标文件时结果卡片显示这一格。
+"""
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+FOODS_FILE = Path(os.environ.get("WAIMAI_FOODS_FILE") or Path(__file__).resolve().parent / "foods.json")
+# 两次检查文件 mtime 的最短间隔（秒）
+CHECK_INTERVAL = 1.0
+MODES = ("减脂", "放纵")
+
+
+class FoodEntry(NamedTuple):
+    """一个品类：减脂品类有注意事项，放纵品类有快乐提示；热量区间已按分类 / 默认值展开；图标为 sprite 格名（可无）。"""
+    品类: str
+    分类: Optional[str]
+    搭配: str
+    注意事项: Tuple[str, ...]
+    快乐提示: Optional[str]
+    热量下限: int
+    热量上限: int
+    图标: Optional[str] = None
+
+
+class Catalogue:
+    """
+    某一版菜品库：模式 → {品类: FoodEntry}（按文件顺序），以及各模式的默认热量与分类热量区间。
+    整体不可变，重新读入时换一个新对象。
+    """
+
+    __slots__ = ("path", "stamp", "_foods", "_ranges")
+
+    def __init__(
+        self,
+        path: Path,
+        stamp: Tuple[int, int],
+        foods: Dict[str, Dict[str, FoodEntry]],
+        ranges: Optional[Dict[str, Tuple[Tuple[int, int], Dict[str, Tuple[int, int]]]]] = None,
+    ):
+        self.path = path
+        self.stamp = stamp
+        self._foods = foods
+        self._ranges = ranges or {}
+
+    def foods(self, mode: str) -> Dict[str, FoodEntry]:
+        """该模式的 {品类: FoodEntry}；调用方不要修改。"""
+        return self._foods["放纵" if mode == "放纵" else "减脂"]
+
+    def calorie_ranges(self, mode: str) -> Tuple[Tuple[int, int], Dict[str, Tuple[int, int]]]:
+        """该模式的 (默认热量区间, {分类: 热量区间})；调用方不要修改。"""
+        mode = "放纵" if mode == "放纵" else "减脂"
+        return self._ranges.get(mode) or ((300, 450) if mode == "减脂" else (500, 1200), {})
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._foods.values())
+
+
+class _Shared:
+    """读入时复用相同的字符串、元组与区间。"""
+
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values = {}
+
+    def text(self, value) -> Optional[str]:
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            raise ValueError(f"应为字符串：{value!r}")
+        return sys.intern(value)
+
+    def notes(self, values) -> Tuple[str, ...]:
+        if isinstance(values, str):
+            values = [values]
+        notes = tuple(self.text(v) for v in values or ())
+        return self._values.setdefault(notes, notes)
+
+    def calorie(self, value, default: Tuple[int, int]) -> Tuple[int, int]:
+        if value is None:
+            return default
+        low, high = (int(v) for v in value)
+        if low < 0 or high < low:
+            raise ValueError(f"热量区间无效：{value!r}")
+        pair = (low, high)
+        return self._values.setdefault(pair, pair)
+
+
+def _parse(doc: dict) -> Tuple[Dict[str, Dict[str, FoodEntry]], Dict[str, tuple]]:
+    shared = _Shared()
+    result = {}
+    ranges = {}
+    for mode in MODES:
+        section = doc.get(mode) or {}
+        default = shared.calorie(section.get("默认热量"), (300, 450) if mode == "减脂" else (500, 1200))
+        by_category = {shared.text(k): shared.calorie(v, default) for k, v in (section.get("分类热量") or {}).items()}
+        default_tip = shared.text(section.get("默认快乐提示"))
+        foods = {}
+        for item in section.get("菜品") or ():
+            name = shared.text(item["品类"])
+            if not name:
+                raise ValueError(f"{mode}：品类不能为空")
+            category = shared.text(item.get("分类"))
+            low, high = shared.calorie(item.get("热量"), by_category.get(category, default))
+            foods[name] = FoodEntry(
+                name,
+                category,
+                shared.text(item.get("搭配", "")),
+                shared.notes(item.get("注意事项")),
+                shared.text(item.get("快乐提示", default_tip if mode == "放纵" else None)),
+                low,
+                high,
+                shared.text(item.get("图标")),
+            )
+        if not foods:
+            raise ValueError(f"{mode}：菜品库为空")
+        result[mode] = foods
+        ranges[mode] = (default, by_category)
+    return result, ranges
+
+
+def _stamp(path: Path) -> Tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def load(path: Path = FOODS_FILE) -> Catalogue:
+    """读入并解析一个菜品库文件；文件不存在抛 OSError，格式有误抛 ValueError。"""
+    path = Path(path)
+    stamp = _stamp(path)
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        return Catalogue(path, stamp, *_parse(doc))
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"{path}：{e!r}") from e
+
+
+_current = None
+_checked = 0.0
+_lock = threading.Lock()
+_stats = {"loads": 0, "checks": 0, "error": None}
+
+
+def catalogue() -> Catalogue:
+    """
+    当前菜品库：首次调用时读入；之后距上次检查超过 CHECK_INTERVAL 秒才 stat 一次文件，变了就重新读入。
+    首次读入失败时抛出异常；重新读入失败时保留旧的菜品库。
+    """
+    global _current, _checked
+    current = _current
+    now = time.monotonic()
+    if current is not None and now - _checked < CHECK_INTERVAL:
+        return current
+    with _lock:
+        current = _current
+        if current is not None and now - _checked < CHECK_INTERVAL:
+            return current
+        _checked = now
+        _stats["checks"] += 1
+        try:
+            stamp = _stamp(FOODS_FILE)
+        except OSError as e:
+            if current is None:
+                raise
+            _stats["error"] = repr(e)
+            return current
+        if current is None or stamp != current.stamp:
+            try:
+                _current = load(FOODS_FILE)
+            except (OSError, ValueError) as e:
+                if current is None:
+                    raise
+                _stats["error"] = repr(e)
+                return current
+            _stats["loads"] += 1
+            _stats["error"] = None
+        return _current
+
+
+def reload() -> Catalogue:
+    """不等 CHECK_INTERVAL，立即检查文件。"""
+    global _checked
+    with _lock:
+        _checked = float("-inf")
+    return catalogue()
+
+
+def stats() -> dict:
+    """读入次数、检查文件次数、最近一次重新读入的错误与当前品类数。"""
+    with _lock:
+        return dict(_stats, entries=len(_current) if _current is not None else 0)
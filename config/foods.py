@@ -1,281 +1,316 @@
 # -*- coding: utf-8 -*-
 """
-外卖扭蛋机・最终完整版菜品库（减脂 20 类 + 放纵 25 类）
-- 减脂：品类 → 推荐菜品 + 减脂建议（1.2.3. 同一块）；热量按分类区间。
+外卖扭蛋机・菜品库与抽卡
+- 菜品库在数据文件 config/foods.json 里（config.catalogue 读入为只读 FoodEntry，首次抽卡时加载，文件改了自动重新读入）。
+- 减脂：品类 → 推荐菜品 + 减脂建议（1.2.3. 同一块）；热量按品类覆盖或分类区间。
 - 放纵：品类 → 推荐搭配 + 快乐提示；存具体品类名；热量 500-1200。
+- 抽卡：按品类权重预建别名表（config.sampling），每次 O(1)；set_weights() 在后台重建后原子替换，菜品库换了也按当前权重重建。
+  draw(mode, rng) 可传每个会话自己的 random.Random，同一种子按同样顺序抽卡结果完全一致；
+  draw_many(mode, n, seed) 用 NumPy 批量抽，返回列式 DrawBatch，供模拟与压测。
+- 预算：calorie_buckets(mode) 按热量下限把品类预分档，剩余热量二分到档位即得候选别名表，不逐个筛品类。
+- 旧版的 DIET_FOODS / INDULGE_FOODS / DIET_CATEGORY_MAP / DIET_CALORIE_BY_CATEGORY / DIET_CALORIE_OVERRIDE /
+  INDULGE_CALORIE_RANGE 仍可用：按当前菜品库派生的只读视图，经 config.foods.<名字> 访问时随菜品库重新读入更新。
 """
 import random
+import threading
+from bisect import bisect_right
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
 
-# ---------- 减脂模式：品类 → 推荐菜品 + 减脂建议（列表） ----------
-DIET_FOODS = {
-    "麦当劳": {
-        "搭配": "双吉士汉堡（不加酱）、板烧鸡腿堡（去酱）、烤鸡胸沙拉、鲜蔬杯",
-        "注意事项": [
-            "去掉酱料和多余面包，只吃肉饼和蔬菜。",
-            "搭配无糖饮料，不喝含糖饮料。",
-            "不搭配薯条、麦乐鸡等高脂小食。",
-        ],
-    },
-    "肯德基": {
-        "搭配": "烤鸡腿堡（去皮）、奥尔良烤翅（去皮）、玉米杯、鸡胸沙拉",
-        "注意事项": [
-            "去皮食用，不吃鸡皮和油脂。",
-            "不搭配薯条、蛋挞、甜筒等高糖高脂食物。",
-            "用玉米杯替代薯条，增加膳食纤维。",
-        ],
-    },
-    "汉堡王": {
-        "搭配": "皇堡（不加酱）、单层牛肉堡（去面包）、烤鸡沙拉",
-        "注意事项": [
-            "去掉酱料和多余面包，只吃肉饼和蔬菜。",
-            "不搭配洋葱圈、薯角等高脂小食。",
-            "搭配无糖可乐或白水。",
-        ],
-    },
-    "赛百味": {
-        "搭配": "火鸡胸 / 烤鸡三明治（全麦面包，不加酱）、蔬菜沙拉",
-        "注意事项": [
-            "选择全麦面包，避免白面包。",
-            "酱料只选黄芥末 / 油醋汁，不选蛋黄酱 / 千岛酱。",
-            "额外加一份蔬菜，增加饱腹感。",
-        ],
-    },
-    "老乡鸡": {
-        "搭配": "蒸鸡胸 + 杂粮饭、蒸蛋 + 小炒肉（去油）、鸡汤（去油）+ 青菜、清炒时蔬",
-        "注意事项": [
-            "不吃鸡汤里的油脂，只喝清汤。",
-            "米饭减半，不吃沾了汤汁的米饭。",
-            "备注少油少盐，避免额外油脂。",
-        ],
-    },
-    "真功夫": {
-        "搭配": "香滑蒸蛋、瘦肉肠粉、白灼菜心、蒸鸡腿饭（去鸡皮）",
-        "注意事项": [
-            "不吃鸡皮和肥肉，只吃瘦肉和蔬菜。",
-            "米饭减半，不喝菜汤。",
-            "不搭配油条、奶黄包等高碳水食物。",
-        ],
-    },
-    "沙县小吃": {
-        "搭配": "蒸饺（不蘸酱）、乌鸡汤（去油）、青菜瘦肉粉（少粉多菜）",
-        "注意事项": [
-            "蒸饺不蘸花生酱 / 甜辣酱，直接吃。",
-            "粉类少粉多菜，避免大量碳水。",
-            "不搭配卤味、炸物等高脂食物。",
-        ],
-    },
-    "大米先生/乡村基": {
-        "搭配": "清炒时蔬、蒸蛋、香煎鸡胸、杂粮饭",
-        "注意事项": [
-            "多选蒸、煮、清炒菜品，少选红烧、油焖。",
-            "米饭半碗，不喝油汤。",
-            "优先搭配两种以上蔬菜。",
-        ],
-    },
-    "砂锅": {
-        "搭配": "砂锅牛肉、砂锅丝瓜、米饭",
-        "注意事项": [
-            "米饭吃一半，不吃沾了酱汁的米饭，不喝汤。",
-            "选择有精瘦肉、蔬菜的品类，额外点一份青菜。",
-            "备注少油少盐。",
-        ],
-    },
-    "粥铺": {
-        "搭配": "瘦肉粥、青菜粥、白煮蛋、凉拌黄瓜",
-        "注意事项": [
-            "粥不要加糖，不选甜粥。",
-            "搭配鸡蛋补充蛋白，不搭配油条、煎饺。",
-            "控制粥量，避免碳水过量。",
-        ],
-    },
-    "面馆": {
-        "搭配": "清汤牛肉面、鸡丝面（少面多菜）、凉拌青菜",
-        "注意事项": [
-            "面量减半，多放青菜和肉。",
-            "不喝浮油汤底，不加油炸配料。",
-            "备注少油、不辣。",
-        ],
-    },
-    "水饺/馄饨": {
-        "搭配": "白菜猪肉水饺（不蘸酱）、虾仁馄饨（清汤）",
-        "注意事项": [
-            "不蘸辣椒油、香油、芝麻酱。",
-            "控制数量，8–12 个为宜。",
-            "搭配一份清汤青菜。",
-        ],
-    },
-    "湘菜": {
-        "搭配": "小炒黄牛肉（去油）+ 青菜、清蒸鱼 + 白灼菜心、番茄炒蛋（少油）、冬瓜排骨汤（去油）",
-        "注意事项": [
-            "少油少盐，不吃肥肉和汤汁。",
-            "搭配白灼菜心，增加膳食纤维。",
-            "不搭配米饭或米饭减半，避免碳水超标。",
-        ],
-    },
-    "粤菜": {
-        "搭配": "白切鸡（去皮）+ 青菜、清蒸鲈鱼、白灼虾 + 生菜、滑鸡煲（少油）",
-        "注意事项": [
-            "去皮食用，不吃鸡皮和油脂。",
-            "选择清蒸 / 白灼做法，避免油炸、红烧。",
-            "不搭配炒饭、炒面等高碳水主食。",
-        ],
-    },
-    "川菜": {
-        "搭配": "水煮牛肉（去油）、清炒时蔬、番茄鸡蛋汤（去油）",
-        "注意事项": [
-            "去掉表面红油，只吃肉和蔬菜。",
-            "不搭配米饭或米饭减半。",
-            "备注少油少盐，避免额外油脂。",
-        ],
-    },
-    "江浙菜": {
-        "搭配": "清蒸鱼、白灼虾、清炒时蔬、菌菇汤",
-        "注意事项": [
-            "选择清蒸 / 白灼做法，避免红烧、糖醋。",
-            "不搭配甜口菜品（如糖醋排骨）。",
-            "搭配一碗清汤，增加饱腹感。",
-        ],
-    },
-    "轻食沙拉": {
-        "搭配": "鸡胸肉沙拉、牛肉沙拉、蔬菜沙拉（油醋汁）",
-        "注意事项": [
-            "酱料只选油醋汁 / 黄芥末，不选沙拉酱 / 千岛酱。",
-            "额外加一份蛋白质（鸡胸 / 牛肉），增加饱腹感。",
-            "不搭配面包、croutons 等高碳水配料。",
-        ],
-    },
-    "麻辣烫": {
-        "搭配": "清汤 + 鸡胸 + 蔬菜、番茄汤底 + 虾滑 + 青菜、菌菇汤底 + 牛肉 + 藕片",
-        "注意事项": [
-            "选择清汤 / 番茄汤底，避免麻辣汤底。",
-            "多菜少肉，优先鸡胸、虾滑、蔬菜。",
-            "不搭配粉丝、方便面等高碳水食材。",
-        ],
-    },
-    "日料": {
-        "搭配": "三文鱼刺身 + 海藻沙拉、烤青花鱼 + 蔬菜沙拉、手握寿司（不蘸酱）",
-        "注意事项": [
-            "刺身不蘸酱油，避免额外钠摄入。",
-            "不吃天妇罗、炸物等高脂食物。",
-            "搭配味增汤（去油），增加饱腹感。",
-        ],
-    },
-    "韩料": {
-        "搭配": "石锅拌饭（少饭多菜）、部队火锅（去汤，多菜少肉）、烤五花肉（去皮）",
-        "注意事项": [
-            "石锅拌饭少饭多菜，不吃锅巴。",
-            "部队火锅去汤，避免喝汤汁。",
-            "不搭配炸鸡、芝士年糕等高脂高糖食物。",
-        ],
-    },
-}
+from config.catalogue import Catalogue, FoodEntry, catalogue
+from config.sampling import AliasTable
 
-# 减脂：品类 → 分类（用于查热量区间）
-DIET_CATEGORY_MAP = {
-    "麦当劳": "快餐连锁类",
-    "肯德基": "快餐连锁类",
-    "汉堡王": "快餐连锁类",
-    "赛百味": "快餐连锁类",
-    "老乡鸡": "中式快餐类",
-    "真功夫": "中式快餐类",
-    "沙县小吃": "中式快餐类",
-    "大米先生/乡村基": "中式快餐类",
-    "砂锅": "中式快餐类",
-    "粥铺": "中式快餐类",
-    "面馆": "中式快餐类",
-    "水饺/馄饨": "中式快餐类",
-    "湘菜": "地方菜系类",
-    "粤菜": "地方菜系类",
-    "川菜": "地方菜系类",
-    "江浙菜": "地方菜系类",
-    "轻食沙拉": "轻食・健康餐类",
-    "麻辣烫": "轻食・健康餐类",
-    "日料": "轻食・健康餐类",
-    "韩料": "轻食・健康餐类",
-}
+# 品类抽中权重（相对值），未列出的品类为 1；运行中可用 set_weights() 调整
+DIET_WEIGHTS = {}
+INDULGE_WEIGHTS = {}
 
-# 减脂：分类 → 热量区间 (kcal)，步长 10
-DIET_CALORIE_BY_CATEGORY = {
-    "快餐连锁类": (250, 400),
-    "中式快餐类": (300, 450),
-    "地方菜系类": (350, 500),
-    "轻食・健康餐类": (200, 400),
-}
-# 品类级热量覆盖（如赛百味 200-400）
-DIET_CALORIE_OVERRIDE = {"赛百味": (200, 400)}
-
-# ---------- 放纵模式：品类 → 推荐搭配统一「点你喜欢吃的」+ 快乐提示统一 ----------
-INDULGE_快乐提示 = "今天开心最重要，不用控制！"
-INDULGE_FOODS = {
-    "炸鸡": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "汉堡": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "薯条": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "披萨": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "湘菜": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "川菜": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "粤菜": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "烧烤": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "火锅": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "麻辣烫": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "螺蛳粉": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "炸串": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "方便面": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "意面": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "卤肉饭": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "炸鸡排": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "关东煮": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "蛋糕": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "抹茶蛋糕": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "巧克力蛋糕": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "磅蛋糕": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "蝴蝶酥面包": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "蛋挞": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "甜甜圈": {"搭配": "点你喜欢吃的", "快乐提示": INDULGE_快乐提示},
-    "奶茶": {"搭配": "点你喜欢喝的", "快乐提示": INDULGE_快乐提示},
-}
+_weights = {"减脂": DIET_WEIGHTS, "放纵": INDULGE_WEIGHTS}
+_tables = {}  # 模式 → (建表时的菜品库, 别名表)
+_tables_lock = threading.Lock()
+_table_versions = {"减脂": 0, "放纵": 0}
+
+
+def _mode(mode: str) -> str:
+    return "放纵" if mode == "放纵" else "减脂"
+
+
+def foods(mode: str) -> Dict[str, FoodEntry]:
+    """当前菜品库里该模式的 {品类: FoodEntry}（只读）。"""
+    return catalogue().foods(mode)
+
+
+def _current(mode: str) -> Tuple[Catalogue, AliasTable]:
+    """(当前菜品库, 按它建的别名表)；菜品库重新读入后首次调用时按当前权重重建。"""
+    cat = catalogue()
+    cached = _tables.get(mode)
+    if cached is not None and cached[0] is cat:
+        return cached
+    with _tables_lock:
+        cached = _tables.get(mode)
+        if cached is None or cached[0] is not cat:
+            cached = _tables[mode] = (cat, AliasTable.from_weights(cat.foods(mode), _weights[mode]))
+        return cached
+
+
+def alias_table(mode: str) -> AliasTable:
+    """当前生效的别名表（只读引用）。"""
+    return _current(_mode(mode))[1]
+
+
+def set_weights(mode: str, weights: Mapping[str, float], wait: bool = False) -> Optional[threading.Thread]:
+    """
+    更新某模式的品类权重：在后台线程重建别名表，建好后替换引用，抽卡不必等待也不加锁。
+    连续多次更新时只有最后一次生效（按版本号丢弃过时的重建）。权重非法时抛 ValueError（在调用线程里校验）。
+    权重会保留下来，之后菜品库重新读入时按它重建（新增的品类为 1）。
+    wait=True 时同步重建并返回 None，否则返回重建线程。
+    """
+    mode = _mode(mode)
+    cat = catalogue()
+    keys = tuple(cat.foods(mode))
+    values = [float(weights.get(k, 1.0)) for k in keys]
+    if any(w < 0 for w in values) or sum(values) <= 0:
+        raise ValueError("权重不能为负，且总和须大于 0")
+    with _tables_lock:
+        _table_versions[mode] += 1
+        version = _table_versions[mode]
+        _weights[mode] = dict(weights)
+
+    def rebuild():
+        table = AliasTable(keys, values)
+        with _tables_lock:
+            if _table_versions[mode] == version:
+                _tables[mode] = (cat, table)
+
+    if wait:
+        rebuild()
+        return None
+    thread = threading.Thread(target=rebuild, name=f"alias-rebuild-{mode}", daemon=True)
+    thread.start()
+    return thread
 
-INDULGE_CALORIE_RANGE = (500, 1200)
 
+CALORIE_STEP = 10
 
-def _random_calorie(low: int, high: int, step: int = 10) -> int:
+
+def _random_calorie(low: int, high: int, step: int = CALORIE_STEP, rng=random) -> int:
     n = (high - low) // step + 1
-    return low + random.randint(0, max(0, n - 1)) * step
+    return low + rng.randint(0, max(0, n - 1)) * step
 
 
-def draw_diet() -> dict:
-    """减脂：等概率抽一个品类；菜品名=品类（存库用）；热量按品类覆盖或分类区间。"""
-    name = random.choice(list(DIET_FOODS.keys()))
-    info = DIET_FOODS[name]
-    low, high = DIET_CALORIE_OVERRIDE.get(name) or DIET_CALORIE_BY_CATEGORY.get(
-        DIET_CATEGORY_MAP.get(name, "中式快餐类"), (300, 450)
-    )
-    return {
-        "品类": name,
-        "菜品名": name,
-        "搭配": info["搭配"],
-        "注意事项": info["注意事项"],
-        "快乐提示": None,
-        "热量": _random_calorie(low, high),
-        "模式": "减脂",
-    }
+def _capped(low: int, high: int, cap: Optional[int]) -> Tuple[int, int]:
+    """热量上限 cap 收窄区间，但不低于区间下限。"""
+    if cap is None:
+        return low, high
+    return low, max(low, min(high, int(cap)))
+
 
+def _pick(mode: str, rng, table: Optional[AliasTable]) -> FoodEntry:
+    """按 table（默认全局权重表）抽一个品类；抽到的品类已不在刚重新读入的菜品库里时改用全局表重抽。"""
+    cat, base = _current(mode)
+    entries = cat.foods(mode)
+    entry = entries.get((table or base).sample(rng))
+    if entry is None:
+        entry = entries[base.sample(rng)]
+    return entry
 
-def draw_indulge() -> dict:
-    """放纵：等概率抽一个品类；菜品名=品类（存具体名）；快乐提示。"""
-    name = random.choice(list(INDULGE_FOODS.keys()))
-    info = INDULGE_FOODS[name]
+
+def _result(mode: str, entry: FoodEntry, calorie: int) -> dict:
+    """抽卡结果 dict；菜品名=品类（存库用）。"""
     return {
-        "品类": name,
-        "菜品名": name,
-        "搭配": info["搭配"],
-        "注意事项": [],
-        "快乐提示": info["快乐提示"],
-        "热量": _random_calorie(*INDULGE_CALORIE_RANGE),
-        "模式": "放纵",
+        "品类": entry.品类,
+        "菜品名": entry.品类,
+        "搭配": entry.搭配,
+        "注意事项": list(entry.注意事项),
+        "快乐提示": entry.快乐提示,
+        "热量": calorie,
+        "模式": mode,
     }
 
 
-def draw(mode: str) -> dict:
+def draw_diet(rng=random, table: Optional[AliasTable] = None, calorie_cap: Optional[int] = None) -> dict:
+    """减脂：按权重抽一个品类（默认等概率）；热量按品类覆盖或分类区间。"""
+    entry = _pick("减脂", rng, table)
+    return _result("减脂", entry, _random_calorie(*_capped(entry.热量下限, entry.热量上限, calorie_cap), rng=rng))
+
+
+def draw_indulge(rng=random, table: Optional[AliasTable] = None, calorie_cap: Optional[int] = None) -> dict:
+    """放纵：按权重抽一个品类（默认等概率）；带快乐提示。"""
+    entry = _pick("放纵", rng, table)
+    return _result("放纵", entry, _random_calorie(*_capped(entry.热量下限, entry.热量上限, calorie_cap), rng=rng))
+
+
+def draw(mode: str, rng=random, table: Optional[AliasTable] = None, calorie_cap: Optional[int] = None) -> dict:
+    """
+    抽一次；rng 为 random.Random 实例（每个会话一个，可按种子重放），默认全局 random。
+    table 为按该模式品类另建的别名表（预算档位、按最近吃过的品类降权等），默认用全局权重表。
+    calorie_cap 为热量上限（预算模式），抽出的热量不超过它，除非品类区间下限已经更高。
+    """
     if mode == "放纵":
-        return draw_indulge()
-    return draw_diet()
+        return draw_indulge(rng, table, calorie_cap)
+    return draw_diet(rng, table, calorie_cap)
+
+
+# 预算档位粒度（kcal）：品类热量下限按此取整分档，档数与菜品库大小无关
+BUDGET_STEP = 100
+
+
+class CalorieBuckets:
+    """
+    某模式按热量下限预分档的候选集：第 j 档为下限 ≤ thresholds[j] 的品类。
+    给定剩余热量二分 thresholds 得到档位，该档的别名表（按当前权重，首次用到时建好）直接抽样，不逐个检查品类；
+    剩余热量连最低一档都不够时仍用最低一档（最清淡的那些品类）。
+    """
+
+    __slots__ = ("base", "thresholds", "_order", "_ends", "_tables", "_lock")
+
+    def __init__(self, base: AliasTable, entries: Mapping[str, FoodEntry]):
+        # 下限向上取整到档位：档内每个品类的下限都不超过该档阈值，也就不超过落在该档的预算
+        lows = [-(-entries[k].热量下限 // BUDGET_STEP) * BUDGET_STEP for k in base.keys]
+        order = sorted(range(base.n), key=lows.__getitem__)
+        thresholds, ends = [], []
+        for pos, i in enumerate(order):
+            if thresholds and thresholds[-1] == lows[i]:
+                ends[-1] = pos + 1
+            else:
+                thresholds.append(lows[i])
+                ends.append(pos + 1)
+        self.base = base
+        self.thresholds = tuple(thresholds)
+        self._order = tuple(order)
+        self._ends = tuple(ends)
+        self._tables = [None] * len(thresholds)
+        self._lock = threading.Lock()
+
+    def bucket(self, budget: float) -> int:
+        return max(0, bisect_right(self.thresholds, budget) - 1)
+
+    def table(self, budget: Optional[float]) -> AliasTable:
+        """剩余热量 budget 下可抽的品类的别名表；None 为不限。"""
+        if budget is None:
+            return self.base
+        j = self.bucket(budget)
+        table = self._tables[j]
+        if table is None:
+            members = self._order[: self._ends[j]]
+            if len(members) == self.base.n:
+                table = self.base
+            else:
+                table = AliasTable([self.base.keys[i] for i in members], [self.base.weights[i] for i in members])
+            with self._lock:
+                self._tables[j] = table
+        return table
+
+
+_buckets = {}
+
+
+def calorie_buckets(mode: str) -> CalorieBuckets:
+    """当前权重表对应的预算分档；set_weights() 换表或菜品库重新读入后首次调用时重建。"""
+    mode = _mode(mode)
+    cat, base = _current(mode)
+    buckets = _buckets.get(mode)
+    if buckets is None or buckets.base is not base:
+        buckets = _buckets[mode] = CalorieBuckets(base, cat.foods(mode))
+    return buckets
+
+
+class DrawBatch(NamedTuple):
+    """
+    draw_many 的列式结果，不为每次抽卡建 dict：
+    categories 为当时别名表的品类，index[i] / calorie[i] 为第 i 次抽中的品类下标与热量（int32 数组）。
+    """
+    mode: str
+    categories: Tuple[str, ...]
+    index: "numpy.ndarray"
+    calorie: "numpy.ndarray"
+
+    def names(self):
+        """第 i 次抽中的品类名（按需逐个取，不建整列字符串）。"""
+        return (self.categories[i] for i in self.index)
+
+    def counts(self) -> dict:
+        """各品类抽中次数。"""
+        import numpy as np
+
+        return dict(zip(self.categories, np.bincount(self.index, minlength=len(self.categories)).tolist()))
+
+    def result(self, i: int) -> dict:
+        """第 i 次抽卡按当前菜品库还原成 draw() 同样的 dict。"""
+        return _result(self.mode, foods(self.mode)[self.categories[self.index[i]]], int(self.calorie[i]))
+
+
+_calorie_columns = {}  # 模式 → (别名表 keys, 每个品类的最低热量, 可选档数)
+
+
+def _calorie_arrays(mode: str, keys: Tuple[str, ...]):
+    """与别名表 keys 对齐的热量下限与档数数组；keys 不变时复用。"""
+    import numpy as np
+
+    cached = _calorie_columns.get(mode)
+    if cached is None or cached[0] is not keys:
+        entries = foods(mode)
+        ranges = [(entries[k].热量下限, entries[k].热量上限) for k in keys]
+        low = np.array([lo for lo, _ in ranges], dtype=np.int32)
+        steps = np.array([max(1, (hi - lo) // CALORIE_STEP + 1) for lo, hi in ranges], dtype=np.int32)
+        cached = _calorie_columns[mode] = (keys, low, steps)
+    return cached[1], cached[2]
+
+
+def draw_many(mode: str, n: int, seed=None, table: Optional[AliasTable] = None) -> DrawBatch:
+    """
+    批量抽 n 次（NumPy 向量化：别名表下标与热量各一次数组运算）。
+    seed 为整数时结果可复现；也可传入 numpy.random.Generator 接着用。table 同 draw()。
+    """
+    import numpy as np
+
+    mode = _mode(mode)
+    rng = np.random.default_rng(seed)
+    table = table or alias_table(mode)
+    index = table.sample_many(n, rng).astype(np.int32, copy=False)
+    low, steps = _calorie_arrays(mode, table.keys)
+    calorie = low[index] + (rng.random(n) * steps[index]).astype(np.int32) * CALORIE_STEP
+    return DrawBatch(mode, table.keys, index, calorie)
+
+
+# ---------- 旧版模块常量：由当前菜品库派生的只读视图 ----------
+
+def _diet_foods(cat: Catalogue) -> Mapping[str, Mapping[str, object]]:
+    return {k: MappingProxyType({"搭配": e.搭配, "注意事项": e.注意事项}) for k, e in cat.foods("减脂").items()}
+
+
+def _indulge_foods(cat: Catalogue) -> Mapping[str, Mapping[str, object]]:
+    return {k: MappingProxyType({"搭配": e.搭配, "快乐提示": e.快乐提示}) for k, e in cat.foods("放纵").items()}
+
+
+def _diet_calorie_override(cat: Catalogue) -> Mapping[str, Tuple[int, int]]:
+    """单个品类自带的热量区间（与所属分类 / 默认区间不同的那些）。"""
+    default, by_category = cat.calorie_ranges("减脂")
+    result = {}
+    for k, e in cat.foods("减脂").items():
+        if (e.热量下限, e.热量上限) != by_category.get(e.分类, default):
+            result[k] = (e.热量下限, e.热量上限)
+    return result
+
+
+_LEGACY_VIEWS = {
+    "DIET_FOODS": _diet_foods,
+    "INDULGE_FOODS": _indulge_foods,
+    "DIET_CATEGORY_MAP": lambda cat: {k: e.分类 for k, e in cat.foods("减脂").items() if e.分类},
+    "DIET_CALORIE_BY_CATEGORY": lambda cat: cat.calorie_ranges("减脂")[1],
+    "DIET_CALORIE_OVERRIDE": _diet_calorie_override,
+    "INDULGE_CALORIE_RANGE": lambda cat: cat.calorie_ranges("放纵")[0],
+}
+_legacy = {}  # 名字 → (菜品库, 视图)
+
+
+def __getattr__(name: str):
+    """旧版常量按当前菜品库现算（每版菜品库只算一次）；from config.foods import X 拿到的是导入时那一版。"""
+    build = _LEGACY_VIEWS.get(name)
+    if build is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    cat = catalogue()
+    cached = _legacy.get(name)
+    if cached is None or cached[0] is not cat:
+        view = build(cat)
+        cached = _legacy[name] = (cat, MappingProxyType(view) if isinstance(view, dict) else view)
+    return cached[1]
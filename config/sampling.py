@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+按权重抽样：Walker / Vose 别名表。
+构建 O(n)，之后每次抽样 O(1)：一个均匀随机数的整数部分选格子，小数部分决定取格子本身还是它的别名，
+不建列表、不做二分查找。表建好后不可变（tuple），换权重就整表重建再替换引用，读的一方不用加锁。
+sample_many() 用 NumPy 一次抽 n 个下标（NumPy 随 Streamlit 安装，只在批量抽样时导入）。
+"""
+import random
+from typing import Hashable, Iterable, Mapping, Sequence, Tuple
+
+
+class AliasTable:
+    """不可变别名表：keys[i] 以 prob[i] 的概率被选中，否则取 keys[alias[i]]。"""
+
+    __slots__ = ("keys", "weights", "prob", "alias", "n", "_arrays")
+
+    def __init__(self, keys: Sequence[Hashable], weights: Sequence[float]):
+        keys = tuple(keys)
+        weights = tuple(float(w) for w in weights)
+        if not keys or len(keys) != len(weights):
+            raise ValueError("keys 与 weights 须非空且等长")
+        if any(w < 0 for w in weights):
+            raise ValueError("权重不能为负")
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("权重之和须大于 0")
+        n = len(keys)
+        scaled = [w * n / total for w in weights]
+        prob = [0.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] = (scaled[g] + scaled[s]) - 1.0
+            (small if scaled[g] < 1.0 else large).append(g)
+        # 剩下的格子只差浮点误差，概率记为 1
+        for i in large + small:
+            prob[i] = 1.0
+        self.keys = keys
+        self.weights = tuple(w / total for w in weights)
+        self.prob = tuple(prob)
+        self.alias = tuple(alias)
+        self.n = n
+        self._arrays = None
+
+    @classmethod
+    def from_weights(cls, keys: Iterable[Hashable], weights: Mapping, default: float = 1.0) -> "AliasTable":
+        """keys 中未出现在 weights 里的按 default 计。"""
+        keys = tuple(keys)
+        return cls(keys, [weights.get(k, default) for k in keys])
+
+    def sample(self, rng=random) -> Hashable:
+        """抽一个 key；rng 为 random.Random 实例或 random 模块。"""
+        u = rng.random() * self.n
+        i = int(u)
+        return self.keys[i] if u - i < self.prob[i] else self.keys[self.alias[i]]
+
+    def sample_many(self, n: int, rng):
+        """一次抽 n 个，返回 keys 下标的 int32 数组；rng 为 numpy.random.Generator。"""
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = (np.array(self.prob, dtype=np.float64), np.array(self.alias, dtype=np.int32))
+        prob, alias = self._arrays
+        u = rng.random(n) * self.n
+        i = u.astype(np.int32)
+        return np.where(u - i < prob[i], i, alias[i])
+
+    def probabilities(self) -> Tuple[Tuple[Hashable, float], ...]:
+        """(key, 概率) 列表，用于核对分布。"""
+        return tuple(zip(self.keys, self.weights))
+
+    def __len__(self) -> int:
+        return self.n
@@ -3,16 +3,135 @@
 本地 SQLite：消费记录，区间=工作日/周末（周一00:00～周五23:59 / 周六00:00～周日23:59）。
 周复盘：总 + 工作日 + 周末 的 消费、热量、用餐次数。
 """
+import atexit
+import json
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from itertools import islice
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
 
 DB_PATH = Path(__file__).resolve().parent / "data" / "records.db"
 
+# 连接池容量：Streamlit 每次 rerun 换一个脚本线程，按线程建连会越积越多，故用小容量共享池
+POOL_SIZE = 4
+# 只读连接池（复盘查询用），WAL 下读不阻塞写，可多开几个
+READ_POOL_SIZE = 8
+# 等锁超时（毫秒）：多人共用一个实例时，写写冲突在此时间内排队重试而不是直接报 database is locked
+BUSY_TIMEOUT_MS = int(os.environ.get("WAIMAI_DB_BUSY_TIMEOUT_MS", "10000"))
+# 每个连接建立时执行一次，之后复用；WAL 下 synchronous=NORMAL 仍保证崩溃后数据库一致
+_PRAGMAS = (
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA synchronous = NORMAL",
+)
 
-def _ensure_db():
-    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
+
+class _ConnectionPool:
+    """有界连接池：连接长期复用（含 sqlite3 的预编译语句缓存），池满时等待归还，进程退出时统一关闭。"""
+
+    def __init__(self, size: int, readonly: bool = False):
+        self._size = size
+        self._readonly = readonly
+        self._idle = []
+        self._all = []
+        self._cond = threading.Condition()
+
+    def _open(self) -> sqlite3.Connection:
+        timeout = BUSY_TIMEOUT_MS / 1000
+        if self._readonly:
+            uri = Path(DB_PATH).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False, cached_statements=256)
+        else:
+            Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(DB_PATH), timeout=timeout, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._cond:
+            while not self._idle and len(self._all) >= self._size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            conn = self._open()
+            self._all.append(conn)
+            return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        with self._cond:
+            if conn in self._all:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def close_all(self) -> None:
+        with self._cond:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all.clear()
+            self._idle.clear()
+            self._cond.notify_all()
+
+
+_pool = _ConnectionPool(POOL_SIZE)
+_read_pool = _ConnectionPool(READ_POOL_SIZE, readonly=True)
+atexit.register(_pool.close_all)
+atexit.register(_read_pool.close_all)
+
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+@contextmanager
+def _connect():
+    """从池中借一个连接；块内正常结束则提交，出错则回滚，最后归还。"""
+    if not _schema_ready:
+        init_db()
+    conn = _pool.acquire()
+    try:
+        with conn:
+            yield conn
+    finally:
+        _pool.release(conn)
+
+
+@contextmanager
+def _read():
+    """借一个只读连接（mode=ro）做查询；不能写，也不会占用写连接池。"""
+    if not _schema_ready:
+        init_db()
+    conn = _read_pool.acquire()
+    try:
+        yield conn
+    finally:
+        _read_pool.release(conn)
+
+
+def close_db() -> None:
+    """关闭池中所有连接（进程退出时自动调用；切换 DB_PATH 前也需调用）。"""
+    global _schema_ready
+    with _schema_lock:
+        _pool.close_all()
+        _read_pool.close_all()
+        _schema_ready = False
+
+
+# ---------- 表结构迁移：按编号顺序执行，已执行的序号记在 PRAGMA user_version ----------
+# 只能在末尾追加新迁移，不能修改或删除已发布的迁移。
+
+
+def _migration_create_records(conn: sqlite3.Connection) -> None:
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS records (
@@ -27,22 +146,220 @@ def _ensure_db():
         )
         """
     )
-    # 兼容旧表：若无 区间 列则添加
-    try:
+
+
+def _migration_add_interval(conn: sqlite3.Connection) -> None:
+    """兼容旧表：若无 区间 列则添加。"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+    if "区间" not in columns:
         conn.execute("ALTER TABLE records ADD COLUMN 区间 TEXT")
-    except sqlite3.OperationalError:
-        pass
-    conn.commit()
-    conn.close()
 
 
-def _parse_weekday(dt_str: str) -> int:
-    """0=周一, 6=周日。"""
-    try:
-        dt = datetime.strptime(dt_str[:19], "%Y-%m-%d %H:%M:%S")
-        return dt.weekday()
-    except Exception:
-        return 0
+def _migration_index_created_at(conn: sqlite3.Connection) -> None:
+    """周统计按 创建时间 范围筛选并读 区间/金额/热量：覆盖索引让查询只扫本周的索引区间、不回表。"""
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_records_created_cover ON records (创建时间, 区间, 金额, 热量)"
+    )
+
+
+def _migration_backfill_interval(conn: sqlite3.Connection) -> None:
+    """旧记录的 区间 为空：按 创建时间 的星期补齐（strftime %w：0=周日, 6=周六），之后统计不再逐行解析日期。"""
+    conn.execute(
+        """
+        UPDATE records
+        SET 区间 = CASE WHEN strftime('%w', 创建时间) IN ('0', '6') THEN '周末' ELSE '工作日' END
+        WHERE 区间 IS NULL OR TRIM(区间) = ''
+        """
+    )
+
+
+# ---------- 汇总表：由 records 上的触发器增量维护，读统计时不再扫明细 ----------
+
+
+def _trigger_names(table: str) -> tuple:
+    """汇总表 table 的三个触发器名：trg_records_{表名第一段}_{insert|delete|update}，如迁移 5 起的 trg_records_weekly_*。"""
+    prefix = table.split("_")[0]
+    return tuple(f"trg_records_{prefix}_{action}" for action in ("insert", "delete", "update"))
+
+
+def _rollup_triggers(table: str, keys: tuple) -> tuple:
+    """
+    生成维护汇总表 table 的 INSERT/DELETE/UPDATE 触发器（名字见 _trigger_names）。
+    keys 为 ((汇总列名, 取值表达式), ...)，表达式中的 {row} 会替换为 NEW / OLD。
+    """
+    insert, delete, update = _trigger_names(table)
+    columns = ", ".join(name for name, _ in keys)
+
+    def match(row: str) -> str:
+        return " AND ".join(f"{name} = {expr.format(row=row)}" for name, expr in keys)
+
+    def add(row: str) -> str:
+        values = ", ".join(expr.format(row=row) for _, expr in keys)
+        return (
+            f"INSERT OR IGNORE INTO {table} ({columns}, 金额, 热量, 次数) VALUES ({values}, 0, 0, 0);\n"
+            f"UPDATE {table} SET 金额 = 金额 + {row}.金额, 热量 = 热量 + {row}.热量, 次数 = 次数 + 1 WHERE {match(row)};\n"
+        )
+
+    def remove(row: str) -> str:
+        return (
+            f"UPDATE {table} SET 金额 = 金额 - {row}.金额, 热量 = 热量 - {row}.热量, 次数 = 次数 - 1 WHERE {match(row)};\n"
+            f"DELETE FROM {table} WHERE {match(row)} AND 次数 <= 0;\n"
+        )
+
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {insert} AFTER INSERT ON records\nBEGIN\n{add('NEW')}END",
+        f"CREATE TRIGGER IF NOT EXISTS {delete} AFTER DELETE ON records\nBEGIN\n{remove('OLD')}END",
+        f"CREATE TRIGGER IF NOT EXISTS {update} AFTER UPDATE OF 金额, 热量, 创建时间, 区间 ON records\n"
+        f"BEGIN\n{remove('OLD')}{add('NEW')}END",
+    )
+
+
+def _rollup_from_records(keys: tuple) -> str:
+    """按 keys 从 records 重新计算汇总（迁移初始化与一致性修复共用）。"""
+    exprs = [expr.format(row="records") for _, expr in keys]
+    selected = ", ".join(f"{expr} AS {name}" for expr, (name, _) in zip(exprs, keys))
+    not_null = " AND ".join(f"{expr} IS NOT NULL" for expr in exprs)
+    group_by = ", ".join(str(i) for i in range(1, len(keys) + 1))
+    return (
+        f"SELECT {selected}, SUM(金额) AS 金额, SUM(热量) AS 热量, COUNT(*) AS 次数 "
+        f"FROM records WHERE {not_null} GROUP BY {group_by}"
+    )
+
+
+def _create_rollup(conn: sqlite3.Connection, table: str, keys: tuple) -> None:
+    key_columns = ", ".join(name for name, _ in keys)
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            {"".join(f"{name} TEXT NOT NULL, " for name, _ in keys)}
+            金额 REAL NOT NULL,
+            热量 INTEGER NOT NULL,
+            次数 INTEGER NOT NULL,
+            PRIMARY KEY ({key_columns})
+        ) WITHOUT ROWID
+        """
+    )
+    for trigger in _rollup_triggers(table, keys):
+        conn.execute(trigger)
+    conn.execute(f"DELETE FROM {table}")
+    conn.execute(f"INSERT INTO {table} ({key_columns}, 金额, 热量, 次数) " + _rollup_from_records(keys))
+
+
+# 周汇总：周起始 = 该周周一日期（如 2026-10-12），与 ISO 周一一对应
+_WEEK_START = ("周起始", "date({row}.创建时间, 'weekday 0', '-6 days')")
+_INTERVAL = ("区间", "COALESCE({row}.区间, '')")
+# 日汇总：按 创建时间 的日期，供任意日期范围 / 按周 / 按月统计
+_DAY = ("日期", "date({row}.创建时间)")
+# 汇总按用户分区（迁移 8 起），用户列放在主键最前
+_USER = ("用户", "{row}.用户")
+_WEEKLY_KEYS = (_USER, _WEEK_START, _INTERVAL)
+_DAILY_KEYS = (_USER, _DAY)
+
+
+def _migration_weekly_summary(conn: sqlite3.Connection) -> None:
+    _create_rollup(conn, "weekly_summary", (_WEEK_START, _INTERVAL))
+
+
+def _migration_daily_rollup(conn: sqlite3.Connection) -> None:
+    _create_rollup(conn, "daily_rollup", (_DAY,))
+
+
+def _migration_index_created_id(conn: sqlite3.Connection) -> None:
+    """明细分页按 (创建时间, id) 游标翻页：单列索引隐含 rowid，ORDER BY 创建时间, id 无需再排序。"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_records_created ON records (创建时间)")
+
+
+def _migration_partition_by_user(conn: sqlite3.Connection) -> None:
+    """
+    每条记录归属一个用户（浏览器本地生成的 ID，旧记录为空串）；所有查询都带 用户 条件，
+    索引与汇总表都以 用户 打头，单个用户的查询耗时只与自己的数据量有关。
+    """
+    conn.execute("ALTER TABLE records ADD COLUMN 用户 TEXT NOT NULL DEFAULT ''")
+    conn.execute("DROP INDEX IF EXISTS idx_records_created_cover")
+    conn.execute("DROP INDEX IF EXISTS idx_records_created")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_records_user_created_cover ON records (用户, 创建时间, 区间, 金额, 热量)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_records_user_created ON records (用户, 创建时间)")
+    for table, keys in (("weekly_summary", _WEEKLY_KEYS), ("daily_rollup", _DAILY_KEYS)):
+        for trigger in _trigger_names(table):
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        _create_rollup(conn, table, keys)
+
+
+def _migration_draw_results(conn: sqlite3.Connection) -> None:
+    """
+    抽卡结果暂存（替代 data/draw_cache/ 下一次一个的 JSON 文件）：按 tid 主键存取，
+    到期时间索引供后台清理按过期先后删除。
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS draw_results (
+            tid TEXT PRIMARY KEY,
+            结果 TEXT NOT NULL,
+            到期 REAL NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_draw_results_expiry ON draw_results (到期)")
+
+
+def _migration_index_user_category_created(conn: sqlite3.Connection) -> None:
+    """「每个品类最近一次吃的时间」：GROUP BY 品类 取 MAX(创建时间) 只扫该用户的索引段，不回表、不另排序。"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_records_user_category_created ON records (用户, 品类, 创建时间)")
+
+
+def _migration_drop_user_created_cover(conn: sqlite3.Connection) -> None:
+    """周统计改读 weekly_summary 后，没有查询再用 (用户, 创建时间, 区间, 金额, 热量) 覆盖索引，删掉省去每次写入的维护开销。"""
+    conn.execute("DROP INDEX IF EXISTS idx_records_user_created_cover")
+
+
+_MIGRATIONS = (
+    _migration_create_records,
+    _migration_add_interval,
+    _migration_index_created_at,
+    _migration_backfill_interval,
+    _migration_weekly_summary,
+    _migration_daily_rollup,
+    _migration_index_created_id,
+    _migration_partition_by_user,
+    _migration_draw_results,
+    _migration_index_user_category_created,
+    _migration_drop_user_created_cover,
+)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    # WAL：读写互不阻塞；该设置写在数据库文件里，只需在事务外设置一次
+    conn.execute("PRAGMA journal_mode = WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(_MIGRATIONS):
+        return
+    for number, migration in enumerate(_MIGRATIONS, start=1):
+        # 多个进程同时启动时，IMMEDIATE 先拿写锁再复查版本，保证每个迁移只执行一次
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < number:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def init_db() -> None:
+    """每个进程只执行一次：把数据库迁移到最新版本。之后的读写不再做任何建表/改表。"""
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn = _pool.acquire()
+        try:
+            _migrate(conn)
+        finally:
+            _pool.release(conn)
+        _schema_ready = True
 
 
 def _interval(weekday: int) -> str:
@@ -50,18 +367,30 @@ def _interval(weekday: int) -> str:
     return "工作日" if weekday <= 4 else "周末"
 
 
-def save_record(菜品名: str, 金额: float, 热量: int, 模式: str, 品类: str) -> None:
-    _ensure_db()
+# 记录写入代数：每次增删改记录加 1，依赖历史记录的进程内缓存（如最近吃过的品类）据此失效
+_records_generation = 0
+
+
+def _records_changed() -> None:
+    global _records_generation
+    _records_generation += 1
+
+
+def records_generation() -> int:
+    """本进程内记录表的写入代数；与缓存时记下的值不同即说明之后有过增删改。"""
+    return _records_generation
+
+
+def save_record(菜品名: str, 金额: float, 热量: int, 模式: str, 品类: str, 用户: str = "") -> None:
     now = datetime.now()
     now_str = now.strftime("%Y-%m-%d %H:%M:%S")
     区间 = _interval(now.weekday())
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.execute(
-        "INSERT INTO records (菜品名, 金额, 热量, 模式, 品类, 创建时间, 区间) VALUES (?,?,?,?,?,?,?)",
-        (菜品名, 金额, 热量, 模式, 品类, now_str, 区间),
-    )
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO records (菜品名, 金额, 热量, 模式, 品类, 创建时间, 区间, 用户) VALUES (?,?,?,?,?,?,?,?)",
+            (菜品名, 金额, 热量, 模式, 品类, now_str, 区间, 用户),
+        )
+    _records_changed()
 
 
 def _week_bounds():
@@ -76,47 +405,32 @@ def _week_bounds():
     return start_ts, end_ts
 
 
-def get_week_stats() -> dict:
+def get_week_stats(用户: str = "") -> dict:
     """
-    根据本周每日记录汇总：总 / 工作日 / 周末 的 消费、热量、用餐次数。
-    时间范围：本周一 00:00 至本周日 23:59，从 records 表按 创建时间 筛选后加总。
+    根据某用户本周每日记录汇总：总 / 工作日 / 周末 的 消费、热量、用餐次数。
+    时间范围：本周一 00:00 至本周日 23:59；直接读触发器维护的 weekly_summary（按主键取本周至多两行）。
     """
-    _ensure_db()
     start_ts, end_ts = _week_bounds()
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(
-        """
-        SELECT 金额, 热量, 区间, 创建时间
-        FROM records
-        WHERE 创建时间 >= ? AND 创建时间 <= ?
-        ORDER BY 创建时间
-        """,
-        (start_ts, end_ts),
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with _read() as conn:
+        rows = conn.execute(
+            "SELECT 区间, 金额, 热量, 次数 FROM weekly_summary WHERE 用户 = ? AND 周起始 = ?", (用户, start_ts[:10])
+        ).fetchall()
 
-    total_amount = total_cal = 0.0
     work_amount = work_cal = 0.0
     weekend_amount = weekend_cal = 0.0
     work_count = weekend_count = 0
 
     for r in rows:
-        amt, cal = r["金额"], r["热量"]
-        ival = (r["区间"] or "").strip()
-        if not ival and r["创建时间"]:
-            ival = _interval(_parse_weekday(r["创建时间"]))
-        total_amount += float(amt)
-        total_cal += int(cal)
-        if ival == "工作日":
-            work_amount += float(amt)
-            work_cal += int(cal)
-            work_count += 1
+        if r["区间"] == "工作日":
+            work_amount += float(r["金额"])
+            work_cal += int(r["热量"])
+            work_count += r["次数"]
         else:
-            weekend_amount += float(amt)
-            weekend_cal += int(cal)
-            weekend_count += 1
+            weekend_amount += float(r["金额"])
+            weekend_cal += int(r["热量"])
+            weekend_count += r["次数"]
+    total_amount = work_amount + weekend_amount
+    total_cal = work_cal + weekend_cal
 
     # 统计范围用于页面展示，便于确认是“按周加总”
     week_start = datetime.strptime(start_ts[:10], "%Y-%m-%d").date()
@@ -130,60 +444,422 @@ def get_week_stats() -> dict:
         "工作日热量": int(work_cal),
         "周末消费": round(weekend_amount, 2),
         "周末热量": int(weekend_cal),
-        "总用餐次数": len(rows),
+        "总用餐次数": work_count + weekend_count,
         "工作日用餐次数": work_count,
         "周末用餐次数": weekend_count,
         "统计范围": range_str,
     }
 
 
-def get_week_records() -> list:
-    """本周内所有记录（含 id、创建时间等），按创建时间正序，用于明细展示与编辑/删除。"""
-    _ensure_db()
+def get_week_records(用户: str = "") -> list:
+    """某用户本周内所有记录（含 id、创建时间等），按创建时间正序，用于明细展示与编辑/删除。"""
     start_ts, end_ts = _week_bounds()
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(
-        """
+    with _read() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, 菜品名, 金额, 热量, 模式, 品类, 创建时间, 区间
+            FROM records
+            WHERE 用户 = ? AND 创建时间 >= ? AND 创建时间 <= ?
+            ORDER BY 创建时间
+            """,
+            (用户, start_ts, end_ts),
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+# 明细每页条数
+RECORDS_PAGE_SIZE = 20
+
+
+def _date_range(start, end) -> tuple:
+    """
+    含首尾两天的日期范围 → (首日, 末日的次日)，均为 "YYYY-MM-DD"，查询用 >= 首日 AND < 次日。
+    start / end 可为 date、datetime 或以 "YYYY-MM-DD" 开头的字符串，只看日期部分。
+    """
+    last = datetime.strptime(str(end)[:10], "%Y-%m-%d").date()
+    return str(start)[:10], (last + timedelta(days=1)).isoformat()
+
+
+def _records_page_query(
+    after: Optional[tuple],
+    limit: int,
+    start: Optional[str],
+    end: Optional[str],
+    模式: Optional[str],
+    品类: Optional[str],
+    用户: str,
+) -> tuple:
+    """
+    get_records_page 的 (SQL, 参数)。有游标时索引范围直接从游标的 创建时间 开始（seek），
+    只跳过与游标同一秒里 id 不大于它的几行；翻到第几页都不再从 start 扫起。
+    """
+    week_start, week_end = _week_bounds()
+    lower, upper = _date_range(start or week_start, end or week_end)
+    where = ["用户 = ?", "创建时间 >= ?", "创建时间 < ?"]
+    params = [用户, max(lower, after[0]) if after else lower, upper]
+    if 模式:
+        where.append("模式 = ?")
+        params.append(模式)
+    if 品类:
+        where.append("品类 = ?")
+        params.append(品类)
+    if after:
+        where.append("(创建时间 > ? OR id > ?)")
+        params.extend((after[0], after[1]))
+    params.append(limit + 1)
+    sql = f"""
         SELECT id, 菜品名, 金额, 热量, 模式, 品类, 创建时间, 区间
         FROM records
-        WHERE 创建时间 >= ? AND 创建时间 <= ?
-        ORDER BY 创建时间
-        """,
-        (start_ts, end_ts),
-    )
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+        WHERE {" AND ".join(where)}
+        ORDER BY 创建时间, id
+        LIMIT ?
+    """
+    return sql, params
+
+
+def get_records_page(
+    after: Optional[tuple] = None,
+    limit: int = RECORDS_PAGE_SIZE,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    模式: Optional[str] = None,
+    品类: Optional[str] = None,
+    用户: str = "",
+) -> tuple:
+    """
+    按 (创建时间, id) 游标分页取明细，按创建时间正序；返回 (本页记录列表, 下一页游标)，无下一页时游标为 None。
+    after 为上一页返回的游标；start / end 为日期（含首尾两天，与 get_range_stats 相同），默认本周；模式 / 品类 为空时不筛选；只查 用户 自己的记录。
+    每页耗时与翻到第几页无关。
+    """
+    sql, params = _records_page_query(after, limit, start, end, 模式, 品类, 用户)
+    with _read() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    records = [dict(r) for r in rows[:limit]]
+    next_cursor = (records[-1]["创建时间"], records[-1]["id"]) if len(rows) > limit else None
+    return records, next_cursor
+
+
+# 统计粒度 → daily_rollup 上的分组表达式
+_GRANULARITY_KEYS = {
+    "day": "日期",
+    "week": "date(日期, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m', 日期)",
+}
 
 
-def get_record_by_id(record_id: int):
-    """按 id 取一条记录，不存在返回 None。"""
-    _ensure_db()
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute("SELECT id, 菜品名, 金额, 热量, 模式, 品类, 创建时间, 区间 FROM records WHERE id = ?", (record_id,))
-    row = cur.fetchone()
-    conn.close()
+def get_range_stats(start, end, granularity: str = "day", 用户: str = "") -> list:
+    """
+    某用户任意日期范围（含首尾两天）的 消费、热量、用餐次数，按 day / week / month 分组，按时间正序。
+    start / end 可为 date 或 "YYYY-MM-DD"；只读 daily_rollup，无记录的周期不返回。
+    周期：day 为日期，week 为该周周一日期，month 为 "YYYY-MM"。
+    """
+    period = _GRANULARITY_KEYS.get(granularity)
+    if period is None:
+        raise ValueError(f"granularity 只能是 {', '.join(_GRANULARITY_KEYS)}：{granularity!r}")
+    with _read() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {period} AS 周期, SUM(金额) AS 金额, SUM(热量) AS 热量, SUM(次数) AS 次数
+            FROM daily_rollup
+            WHERE 用户 = ? AND 日期 >= ? AND 日期 < ?
+            GROUP BY 1
+            ORDER BY 1
+            """,
+            (用户, *_date_range(start, end)),
+        ).fetchall()
+    return [
+        {"周期": r["周期"], "消费": round(r["金额"], 2), "热量": int(r["热量"]), "用餐次数": r["次数"]}
+        for r in rows
+    ]
+
+
+def get_last_eaten(用户: str = "", since: Optional[str] = None) -> dict:
+    """
+    该用户每个品类最近一次记录的 创建时间（"YYYY-MM-DD HH:MM:SS"），只含 since 之后吃过的品类。
+    走 (用户, 品类, 创建时间) 覆盖索引：按 品类 分组取 MAX，耗时只与该用户的记录数有关。
+    """
+    with _read() as conn:
+        rows = conn.execute(
+            "SELECT 品类, MAX(创建时间) AS 最近 FROM records WHERE 用户 = ? GROUP BY 品类 HAVING 最近 >= ?",
+            (用户, since or ""),
+        ).fetchall()
+    return {r["品类"]: r["最近"] for r in rows}
+
+
+def get_record_by_id(record_id: int, 用户: str = ""):
+    """按 id 取该用户的一条记录，不存在（或属于别的用户）返回 None。"""
+    with _read() as conn:
+        row = conn.execute(
+            "SELECT id, 菜品名, 金额, 热量, 模式, 品类, 创建时间, 区间 FROM records WHERE id = ? AND 用户 = ?",
+            (record_id, 用户),
+        ).fetchone()
     return dict(row) if row else None
 
 
-def update_record(record_id: int, 菜品名: str, 金额: float, 热量: int, 模式: str, 品类: str) -> None:
-    """按 id 更新一条记录；区间按创建时间不变（不改写入日），仅改金额/热量等。"""
-    _ensure_db()
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.execute(
-        "UPDATE records SET 菜品名=?, 金额=?, 热量=?, 模式=?, 品类=? WHERE id=?",
-        (菜品名, 金额, 热量, 模式, 品类, record_id),
-    )
-    conn.commit()
-    conn.close()
+def update_record(
+    record_id: int, 菜品名: str, 金额: float, 热量: int, 模式: str, 品类: str, 用户: str = ""
+) -> None:
+    """按 id 更新该用户的一条记录；区间按创建时间不变（不改写入日），仅改金额/热量等。"""
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE records SET 菜品名=?, 金额=?, 热量=?, 模式=?, 品类=? WHERE id=? AND 用户=?",
+            (菜品名, 金额, 热量, 模式, 品类, record_id, 用户),
+        )
+    _records_changed()
+
+
+def delete_record(record_id: int, 用户: str = "") -> None:
+    """按 id 删除该用户的一条记录。"""
+    with _connect() as conn:
+        conn.execute("DELETE FROM records WHERE id = ? AND 用户 = ?", (record_id, 用户))
+    _records_changed()
+
+
+# ---------- 升级前的记录：迁移 8 之前没有 用户 列，旧记录的 用户 为空串 ----------
+
+
+def count_legacy_records() -> int:
+    """未归属任何用户（用户 = ''）的记录条数。"""
+    with _read() as conn:
+        return conn.execute("SELECT COUNT(*) FROM records WHERE 用户 = ''").fetchone()[0]
+
+
+def claim_legacy_records(用户: str, only_if_unclaimed: bool = False) -> int:
+    """
+    把 用户 = '' 的旧记录归到 用户 名下，并重算两张汇总表里这两个用户的行；返回归属的条数。
+    only_if_unclaimed=True 时只在库里还没有任何用户的记录时执行（升级后第一个访问的浏览器认领旧数据），
+    判断与更新在同一条 UPDATE 里完成，多个会话同时认领也只有一个成功。
+    """
+    if not 用户:
+        return 0
+    with _read() as conn:
+        if conn.execute("SELECT 1 FROM records WHERE 用户 = '' LIMIT 1").fetchone() is None:
+            return 0
+    sql = "UPDATE records SET 用户 = ? WHERE 用户 = ''"
+    if only_if_unclaimed:
+        sql += " AND NOT EXISTS (SELECT 1 FROM records WHERE 用户 > '')"
+    with _connect() as conn:
+        # 汇总触发器只在金额 / 热量 / 时间 / 区间变化时触发，改 用户 后按明细重算这两个用户的汇总
+        claimed = conn.execute(sql, (用户,)).rowcount
+        if claimed:
+            for table, keys in (("weekly_summary", _WEEKLY_KEYS), ("daily_rollup", _DAILY_KEYS)):
+                columns = ", ".join(name for name, _ in keys)
+                conn.execute(f"DELETE FROM {table} WHERE 用户 IN ('', ?)", (用户,))
+                conn.execute(
+                    f"INSERT INTO {table} ({columns}, 金额, 热量, 次数) "
+                    f"SELECT * FROM ({_rollup_from_records(keys)}) WHERE 用户 = ?",
+                    (用户,),
+                )
+    if claimed:
+        _records_changed()
+    return claimed
+
+
+# 导入/导出的字段（不含 id：导入时由数据库重新分配）
+RECORD_FIELDS = ("菜品名", "金额", "热量", "模式", "品类", "创建时间", "区间", "用户")
+
+
+def iter_records(batch_size: int = 1000, 用户: Optional[str] = None) -> Iterator[dict]:
+    """
+    按 创建时间, id 正序逐条产出记录（用户 为 None 时导出全部用户，按用户分组、组内按时间）；
+    顺序与 (用户, 创建时间) 索引一致，不在内存里排序；每次 fetchmany 一批，内存占用与总条数无关。
+    """
+    with _read() as conn:
+        if 用户 is None:
+            cur = conn.execute(f"SELECT {', '.join(RECORD_FIELDS)} FROM records ORDER BY 用户, 创建时间, id")
+        else:
+            cur = conn.execute(
+                f"SELECT {', '.join(RECORD_FIELDS)} FROM records WHERE 用户 = ? ORDER BY 创建时间, id", (用户,)
+            )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for r in rows:
+                yield dict(r)
+
+
+def insert_records(records: Iterable[dict], batch_size: int = 5000, 用户: Optional[str] = None) -> int:
+    """
+    批量写入记录（字段见 RECORD_FIELDS，区间 可缺省，按 创建时间 推算），返回写入条数。
+    用户 不为 None 时全部记到该用户名下，否则取每条记录自带的 用户（缺省为空串）。
+    全部批次在同一事务内 executemany，任一条不合法则整体回滚并抛 ValueError。
+    """
+    def rows():
+        for n, rec in enumerate(records, start=1):
+            try:
+                created = datetime.fromisoformat(str(rec["创建时间"]).strip())
+                区间 = (rec.get("区间") or "").strip() or _interval(created.weekday())
+                yield (
+                    str(rec["菜品名"]),
+                    float(rec["金额"]),
+                    int(float(rec["热量"])),
+                    str(rec["模式"]),
+                    str(rec["品类"]),
+                    created.strftime("%Y-%m-%d %H:%M:%S"),
+                    区间,
+                    str(rec.get("用户") or "") if 用户 is None else 用户,
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"第 {n} 条记录无效：{e!r}") from e
+
+    source = rows()
+    count = 0
+    with _connect() as conn:
+        batch = list(islice(source, batch_size))
+        while batch:
+            conn.executemany(
+                f"INSERT INTO records ({', '.join(RECORD_FIELDS)}) VALUES ({', '.join('?' * len(RECORD_FIELDS))})",
+                batch,
+            )
+            count += len(batch)
+            batch = list(islice(source, batch_size))
+    _records_changed()
+    return count
+
+
+def check_weekly_summary(repair: bool = False) -> list:
+    """
+    核对 weekly_summary 与 records 实时加总是否一致，返回不一致的 (用户, 周起始, 区间) 列表。
+    repair=True 时在同一事务内按 records 重建整张汇总表。
+    """
+    with _connect() as conn:
+        expected = {(r["用户"], r["周起始"], r["区间"]): r for r in conn.execute(_rollup_from_records(_WEEKLY_KEYS))}
+        actual = {(r["用户"], r["周起始"], r["区间"]): r for r in conn.execute("SELECT * FROM weekly_summary")}
+        mismatched = []
+        for key in sorted(set(expected) | set(actual)):
+            e, a = expected.get(key), actual.get(key)
+            if (
+                e is None
+                or a is None
+                or abs(e["金额"] - a["金额"]) > 0.005
+                or e["热量"] != a["热量"]
+                or e["次数"] != a["次数"]
+            ):
+                mismatched.append(key)
+        if repair and mismatched:
+            conn.execute("DELETE FROM weekly_summary")
+            conn.execute(
+                "INSERT INTO weekly_summary (用户, 周起始, 区间, 金额, 热量, 次数) " + _rollup_from_records(_WEEKLY_KEYS)
+            )
+    return mismatched
+
+
+# ---------- 抽卡结果暂存：跳转后凭 tid 取回，任意进程可读；过期或超量由后台线程清理 ----------
+
+# 保存时长（秒）：抽完到点「就吃这个」之间的时间，远小于此值
+DRAW_RESULT_TTL = int(os.environ.get("WAIMAI_DRAW_RESULT_TTL", "3600"))
+# 最多保留条数，超出时先删最早到期的
+DRAW_RESULT_MAX = int(os.environ.get("WAIMAI_DRAW_RESULT_MAX", "10000"))
+# 后台清理间隔（秒）；另外每写入 DRAW_RESULT_SWEEP_EVERY 条提前唤醒一次，忙时也不会超量太多
+DRAW_RESULT_SWEEP_INTERVAL = 60
+DRAW_RESULT_SWEEP_EVERY = 256
+
+_draw_stats = {"puts": 0, "hits": 0, "misses": 0, "deletes": 0, "expired": 0, "evicted": 0, "sweeps": 0}
+_draw_stats_lock = threading.Lock()
+_sweeper = None
+_sweeper_lock = threading.Lock()
+_sweeper_wake = threading.Event()
+_sweeper_stop = threading.Event()
+
+
+def _count_draw(name: str, n: int = 1) -> int:
+    with _draw_stats_lock:
+        _draw_stats[name] += n
+        return _draw_stats[name]
+
+
+def put_draw_result(tid: str, result: dict, ttl: Optional[float] = None) -> None:
+    """保存一次抽卡结果（同 tid 覆盖），ttl 秒后过期。"""
+    expires = time.time() + (DRAW_RESULT_TTL if ttl is None else ttl)
+    payload = json.dumps(result, ensure_ascii=False)
+    with _connect() as conn:
+        conn.execute("INSERT OR REPLACE INTO draw_results (tid, 结果, 到期) VALUES (?, ?, ?)", (tid, payload, expires))
+    _start_draw_sweeper()
+    if _count_draw("puts") % DRAW_RESULT_SWEEP_EVERY == 0:
+        _sweeper_wake.set()
+
+
+def get_draw_result(tid: str, with_expiry: bool = False):
+    """
+    按 tid 取回抽卡结果；不存在或已过期返回 None（不删除，由后台清理）。
+    with_expiry=True 时返回 (结果, 到期时间戳)，供上层缓存按同一时间过期。
+    """
+    if not tid:
+        return None
+    with _read() as conn:
+        row = conn.execute("SELECT 结果, 到期 FROM draw_results WHERE tid = ? AND 到期 > ?", (tid, time.time())).fetchone()
+    _count_draw("hits" if row else "misses")
+    if row is None:
+        return None
+    result = json.loads(row[0])
+    return (result, row[1]) if with_expiry else result
+
+
+def delete_draw_result(tid: str) -> None:
+    if not tid:
+        return
+    with _connect() as conn:
+        deleted = conn.execute("DELETE FROM draw_results WHERE tid = ?", (tid,)).rowcount
+    if deleted:
+        _count_draw("deletes", deleted)
+
+
+def sweep_draw_results(now: Optional[float] = None, max_entries: Optional[int] = None) -> tuple:
+    """删除已过期的结果，再把总数削到 max_entries（默认 DRAW_RESULT_MAX）以内；返回 (过期删除数, 超量删除数)。"""
+    now = time.time() if now is None else now
+    limit = DRAW_RESULT_MAX if max_entries is None else max_entries
+    with _connect() as conn:
+        expired = conn.execute("DELETE FROM draw_results WHERE 到期 <= ?", (now,)).rowcount
+        over = conn.execute("SELECT COUNT(*) FROM draw_results").fetchone()[0] - limit
+        evicted = 0
+        if over > 0:
+            evicted = conn.execute(
+                "DELETE FROM draw_results WHERE tid IN (SELECT tid FROM draw_results ORDER BY 到期 LIMIT ?)", (over,)
+            ).rowcount
+    _count_draw("sweeps")
+    if expired:
+        _count_draw("expired", expired)
+    if evicted:
+        _count_draw("evicted", evicted)
+    return expired, evicted
+
+
+def draw_store_stats() -> dict:
+    """本进程的存取 / 清理计数，以及表中当前条数。"""
+    with _read() as conn:
+        entries = conn.execute("SELECT COUNT(*) FROM draw_results").fetchone()[0]
+    with _draw_stats_lock:
+        return dict(_draw_stats, entries=entries)
+
+
+def _sweep_loop() -> None:
+    while not _sweeper_stop.is_set():
+        _sweeper_wake.wait(DRAW_RESULT_SWEEP_INTERVAL)
+        _sweeper_wake.clear()
+        if _sweeper_stop.is_set():
+            break
+        try:
+            sweep_draw_results()
+        except sqlite3.Error:
+            pass  # 下一轮再试；取结果时本就按到期时间过滤
+
+
+def _stop_draw_sweeper() -> None:
+    _sweeper_stop.set()
+    _sweeper_wake.set()
+    if _sweeper is not None:
+        _sweeper.join(timeout=5)
 
 
-def delete_record(record_id: int) -> None:
-    """按 id 删除一条记录。"""
-    _ensure_db()
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.execute("DELETE FROM records WHERE id = ?", (record_id,))
-    conn.commit()
-    conn.close()
+def _start_draw_sweeper() -> None:
+    """首次写入时启动后台清理线程（每进程一个，守护线程，退出时先于连接池关闭）。"""
+    global _sweeper
+    if _sweeper is not None:
+        return
+    with _sweeper_lock:
+        if _sweeper is not None:
+            return
+        _sweeper = threading.Thread(target=_sweep_loop, name="draw-results-sweeper", daemon=True)
+        _sweeper.start()
+        atexit.register(_stop_draw_sweeper)
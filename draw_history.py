@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+推荐模式：最近几天吃过的品类调低抽中概率，避免连着几天抽到同一个品类。
+每个用户一份「品类 → 距今天数」的小向量，来自 db.get_last_eaten（(用户, 品类, 创建时间) 覆盖索引），
+在此基础上按模式建好降权后的别名表一起缓存；抽卡时只查字典再 O(1) 抽样，不扫历史记录。
+缓存到本进程下一次增删改记录（db.records_generation 变化）、跨天、基础权重表被替换或 CACHE_TTL 秒后失效；
+别的服务进程写入的记录最迟 CACHE_TTL 秒后生效。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Optional
+
+from config.foods import alias_table
+from config.sampling import AliasTable
+from db import get_last_eaten, records_generation
+
+# 回看天数：今天算第 0 天，距今 RECENT_DAYS 天及更早的不再降权；默认 0 关闭推荐模式（抽卡概率与原先一致）
+RECENT_DAYS = int(os.environ.get("WAIMAI_RECENT_DAYS", "0"))
+# 今天刚吃过的品类权重乘以该系数，之后按天线性回升到 1
+RECENT_FLOOR = 0.1
+CACHE_TTL = 300
+# 进程内最多缓存的用户数
+CACHE_SIZE = 1024
+
+
+def recent_factor(days_ago: int) -> float:
+    """距今 days_ago 天吃过的品类的权重系数。"""
+    if days_ago >= RECENT_DAYS:
+        return 1.0
+    return RECENT_FLOOR + (1.0 - RECENT_FLOOR) * max(0, days_ago) / RECENT_DAYS
+
+
+class _Entry:
+    __slots__ = ("generation", "day", "expires", "recency", "tables")
+
+    def __init__(self, generation: int, day: date, expires: float, recency: dict):
+        self.generation = generation
+        self.day = day
+        self.expires = expires
+        self.recency = recency
+        self.tables = {}  # id(基础表) → (基础表, 降权后的表)
+
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "rebuilds": 0}
+
+
+def _load(用户: str, today: date) -> dict:
+    since = (today - timedelta(days=RECENT_DAYS - 1)).strftime("%Y-%m-%d 00:00:00")
+    recency = {}
+    for 品类, last in get_last_eaten(用户, since).items():
+        recency[品类] = (today - date.fromisoformat(last[:10])).days
+    return recency
+
+
+def _entry(用户: str) -> _Entry:
+    today = date.today()
+    now = time.time()
+    generation = records_generation()
+    with _lock:
+        entry = _entries.get(用户)
+        if entry is not None and entry.generation == generation and entry.day == today and entry.expires > now:
+            _entries.move_to_end(用户)
+            _stats["hits"] += 1
+            return entry
+        _stats["misses"] += 1
+    entry = _Entry(generation, today, now + CACHE_TTL, _load(用户, today))
+    with _lock:
+        _entries[用户] = entry
+        _entries.move_to_end(用户)
+        while len(_entries) > CACHE_SIZE:
+            _entries.popitem(last=False)
+    return entry
+
+
+def recency(用户: str = "") -> dict:
+    """该用户最近 RECENT_DAYS 天内吃过的品类 → 距今天数（今天为 0）。"""
+    if RECENT_DAYS <= 0:
+        return {}
+    return _entry(用户).recency
+
+
+def table_for(mode: str, 用户: str = "", base: Optional[AliasTable] = None) -> AliasTable:
+    """
+    该用户本模式的抽卡别名表：基础权重 × 最近吃过的降权系数；没有近期记录或已关闭时就是基础表。
+    base 默认为该模式的全局权重表，也可以是它的子集（如预算档位的候选表）。
+    """
+    base = base or alias_table(mode)
+    if RECENT_DAYS <= 0:
+        return base
+    entry = _entry(用户)
+    cached = entry.tables.get(id(base))
+    if cached is not None and cached[0] is base:
+        return cached[1]
+    if not any(k in entry.recency for k in base.keys):
+        table = base
+    else:
+        weights = [w * recent_factor(entry.recency[k]) if k in entry.recency else w for k, w in zip(base.keys, base.weights)]
+        table = AliasTable(base.keys, weights)
+        with _lock:
+            _stats["rebuilds"] += 1
+    entry.tables[id(base)] = (base, table)
+    return table
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def stats() -> dict:
+    """缓存命中 / 未命中（查库）次数、降权表重建次数与缓存用户数。"""
+    with _lock:
+        return dict(_stats, users=len(_entries))
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+抽卡结果存取：进程内有界 LRU 挡在 db.draw_results 前面。
+写入同时写表（所有服务进程都能凭 tid 取回），读取先查本进程 LRU，未命中再查表并回填。
+LRU 条目带与表相同的到期时间，超过条数上限淘汰最久未用的，内存占用与抽卡总次数无关。
+Streamlit 每次 rerun 都会重新执行 app.py，放在 app.py 里的模块级 dict 每次都是空的，所以放在这里。
+结果按 tid 只写一次、不会修改；别的进程删除后，本进程 LRU 里的副本最多保留到原到期时间。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from db import DRAW_RESULT_TTL, delete_draw_result, get_draw_result, put_draw_result
+
+# 进程内最多缓存的结果条数（每条约 1 KB）
+LRU_SIZE = 1024
+
+
+class _DrawLRU:
+    """tid → (到期时间, 结果) 的有界 LRU。线程安全。"""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, tid: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(tid)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[tid]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(tid)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, tid: str, result: dict, expires: float) -> None:
+        with self._lock:
+            self._entries[tid] = (expires, result)
+            self._entries.move_to_end(tid)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, tid: str) -> None:
+        with self._lock:
+            self._entries.pop(tid, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries)}
+
+
+_lru = _DrawLRU(LRU_SIZE)
+
+
+def save(tid: str, result: dict) -> None:
+    """保存一次抽卡结果：写表（跨进程可读）并放入本进程 LRU。"""
+    expires = time.time() + DRAW_RESULT_TTL
+    put_draw_result(tid, result, ttl=DRAW_RESULT_TTL)
+    _lru.put(tid, result, expires)
+
+
+def load(tid: str) -> Optional[dict]:
+    """按 tid 取回抽卡结果（先 LRU 后表）；不存在或已过期返回 None。"""
+    if not tid:
+        return None
+    result = _lru.get(tid)
+    if result is not None:
+        return result
+    entry = get_draw_result(tid, with_expiry=True)
+    if entry is None:
+        return None
+    result, expires = entry
+    _lru.put(tid, result, expires)
+    return result
+
+
+def delete(tid: str) -> None:
+    """结果用完（弹窗关闭 / 已记录）后删除。"""
+    if not tid:
+        return
+    _lru.discard(tid)
+    delete_draw_result(tid)
+
+
+def stats() -> dict:
+    """本进程 LRU 的命中 / 未命中 / 淘汰次数与条数。"""
+    return _lru.stats()
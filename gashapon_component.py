@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+首页扭蛋机的双向 Streamlit 组件。
+前端页由 assets/gashapon_template.html 填入图片地址后写到 build/components/gashapon/index.html，
+浏览器只在打开页面时加载一次；之后每次 rerun 只通过组件通道传模式、配色和抽卡结果等几百字节的参数。
+页面内「点击抽取」「就吃这个」、模式按钮与底部入口把 {action, id, uid, …} 作为组件值回传
+（draw / record / mode / nav），触发一次脚本运行，不再整页跳转。
+组件需在被导入的模块里声明（app.py 每次 rerun 都重新执行）。
+build/ 不可写（只读部署）时组件页写不出来：改用 components.html 内嵌整页，参数直接写进页面，
+页面内的操作按查询参数（?draw=1、?mode=…、?action=…、?record=1&tid=…）整页跳转，由 app.py 的路由处理。
+"""
+import html as html_module
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import streamlit.components.v1 as components
+
+from html_template import render_cached
+
+TEMPLATE = Path(__file__).resolve().parent / "assets" / "gashapon_template.html"
+FRONTEND_DIR = Path(__file__).resolve().parent / "build" / "components" / "gashapon"
+
+_MACHINE_PLACEHOLDER = "data:image/svg+xml," + html_module.escape(
+    '<svg xmlns="http://www.w3.org/2000/svg" width="200" height="260"><rect width="200" height="260" rx="16" fill="#4ECDC4"/>'
+    '<text x="100" y="140" text-anchor="middle" fill="#fff" font-size="18">扭蛋机</text></svg>'
+)
+_BALL_PLACEHOLDER = "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='48' height='48'%3E%3Ccircle cx='24' cy='24' r='22' fill='%234ECDC4'/%3E%3C/svg%3E"
+
+try:
+    FRONTEND_DIR.mkdir(parents=True, exist_ok=True)
+except OSError:
+    pass  # 只读部署：publish_frontend 写入 index.html 失败后改为内嵌显示
+_component = components.declare_component("gashapon", path=str(FRONTEND_DIR))
+_published = None
+# 组件页写入失败时的整页 HTML（内嵌显示用）；写入成功后为 None
+_inline = None
+
+
+def publish_frontend(machine_src: str = "", ball_src: str = "", ball_left_src: str = "", ball_right_src: str = "") -> bool:
+    """
+    按当前图片地址渲染组件页并写入 index.html；内容没变（同一渲染缓存对象）时什么也不做。
+    模板不存在返回 False；写入失败（只读）时记下 HTML，gashapon() 改为内嵌显示，仍返回 True。
+    """
+    global _published, _inline
+    machine_src = machine_src or _MACHINE_PLACEHOLDER
+    ball_src = ball_src or _BALL_PLACEHOLDER
+    ball_left_src = ball_left_src or ball_src
+    ball_right_src = ball_right_src or ball_src
+    html = render_cached(
+        TEMPLATE,
+        (machine_src, ball_src, ball_left_src, ball_right_src),
+        lambda: {
+            "MACHINE_SRC": html_module.escape(machine_src),
+            "BALL_SRC": html_module.escape(ball_src),
+            "BALL_LEFT_SRC": html_module.escape(ball_left_src),
+            "BALL_RIGHT_SRC": html_module.escape(ball_right_src),
+        },
+    )
+    if html is None:
+        return False
+    if html is _published:
+        return True
+    target = FRONTEND_DIR / "index.html"
+    try:
+        current = target.read_text(encoding="utf-8")
+    except OSError:
+        current = None
+    if current != html:
+        tmp = target.with_name(f".index.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(html, encoding="utf-8")
+            os.replace(tmp, target)
+        except OSError:
+            _published, _inline = html, html
+            return True
+    _published, _inline = html, None
+    return True
+
+
+def _render_inline(html: str, mode: str, modes: dict, idle: dict, reply: Optional[dict], height: int) -> None:
+    """组件页不可用时用 components.html 内嵌整页：参数写进 WAIMAI_INLINE，页面内操作改为查询参数跳转。"""
+    args = json.dumps({"mode": mode, "modes": modes, "idle": idle, "reply": reply}, ensure_ascii=False).replace("</", "<\\/")
+    components.html(html.replace("<head>", f"<head>\n<script>window.WAIMAI_INLINE = {args};</script>", 1), height=height)
+
+
+def gashapon(
+    mode: str,
+    modes: dict,
+    idle: dict,
+    reply: Optional[dict] = None,
+    height: int = 800,
+    key: str = "gashapon",
+) -> Optional[dict]:
+    """
+    渲染扭蛋机组件，返回页面最近一次回传的事件（没有则 None）。
+    modes = {模式名: {"icon", "badge", "bg", "color"}}，idle = 未选中按钮的 {"bg", "color"}：
+    两种模式的样式都交给页面，点击模式按钮时页面先自行切换显示，不等这次运行返回。
+    reply = {"id": 抽卡事件 id, "result": 结果}：页面只在 id 与自己等待中的事件一致时播放结果；
+    带 "play": True 时是服务端已抽好的结果（「再抽一次」），页面直接摇晃并播放，每个 id 只播一次。
+    组件页写不进磁盘时内嵌显示，没有回传事件，返回 None（操作经查询参数到达）。
+    """
+    if _inline is not None:
+        _render_inline(_inline, mode, modes, idle, reply, height)
+        return None
+    return _component(
+        mode=mode,
+        modes=modes,
+        idle=idle,
+        reply=reply,
+        height=height,
+        key=key,
+        default=None,
+    )
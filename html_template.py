@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+HTML 模板（占位符形如 __NAME__）的预编译与渲染缓存。
+模板按 (路径, mtime) 只读取、切分一次，填充时一次 join 拼出整页；
+不含抽卡结果的页面（首页待机）按全部参数缓存整页输出，重复渲染只是一次字典查找。
+与 asset_cache 一样放在被导入的模块里，随进程常驻，不受 app.py 每次 rerun 重新执行影响。
+"""
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Hashable, Mapping, Optional
+
+_PLACEHOLDER_RE = re.compile(r"(__[A-Z][A-Z_]*__)")
+
+# 整页输出缓存条数；一页约 20 KB（静态 URL）或约 1 MB（内嵌 data URI）
+RENDER_CACHE_SIZE = 32
+
+
+class CompiledTemplate:
+    """模板切分为 [文本, 占位符, 文本, …]，渲染时只替换占位符所在下标再 join。"""
+
+    def __init__(self, text: str):
+        self._segments = _PLACEHOLDER_RE.split(text)
+        self._slots = tuple((i, self._segments[i][2:-2]) for i in range(1, len(self._segments), 2))
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """按名字填充占位符（不转义，调用方负责）；模板里有而 values 里没有的占位符保留原样。"""
+        parts = self._segments[:]
+        for i, name in self._slots:
+            value = values.get(name)
+            if value is not None:
+                parts[i] = value
+        return "".join(parts)
+
+
+class _RenderCache:
+    """整页输出的 LRU 缓存，键由调用方给出（需可哈希）。线程安全。"""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: Hashable, html: str) -> None:
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+_renders = _RenderCache(RENDER_CACHE_SIZE)
+
+
+def load_template(path: Path) -> Optional[CompiledTemplate]:
+    """读取并预编译模板，按 mtime 复用；文件被替换时重新编译并清空整页缓存。文件不存在返回 None。"""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    key = str(path)
+    with _templates_lock:
+        entry = _templates.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+    try:
+        compiled = CompiledTemplate(path.read_text(encoding="utf-8"))
+    except OSError:
+        return None
+    with _templates_lock:
+        _templates[key] = (mtime, compiled)
+    _renders.clear()
+    return compiled
+
+
+def render_cached(path: Path, key: Hashable, make_values: Callable[[], Mapping[str, str]]) -> Optional[str]:
+    """按 key 缓存整页输出，未命中时才调用 make_values 生成填充值；key 须涵盖所有影响填充值的参数。模板不存在返回 None。"""
+    template = load_template(path)
+    if template is None:
+        return None
+    cache_key = (str(path), key)
+    html = _renders.get(cache_key)
+    if html is None:
+        html = template.render(make_values())
+        _renders.put(cache_key, html)
+    return html
+
+
+def render_stats() -> dict:
+    """整页缓存命中 / 未命中次数与当前条数。"""
+    return _renders.stats()
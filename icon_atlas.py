@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+食物图标索引与图集。
+- 索引：首次使用时建一次（菜品库重新读入或图集重建后再重建），把菜品库两种模式的每个品类映射到一块图标区域
+  （图片路径 + 裁剪框），抽卡时只查字典，不再逐个探测 food-icons/{品类}.png。
+  没有单独图标的品类用菜品库里该品类的 "图标"（sprite 格名），未填或格名不对时用 DEFAULT_CELL。
+- 图集：python asset_pipeline.py 把 food-icons/ 下的单品类图标和 sprite.png 的 8 格统一缩放成 TILE 见方，
+  拼进一张 build/food-icons/atlas.webp，偏移与整图尺寸写入 atlas.json；建过图集后索引改指向它。
+结果卡片用 CSS background-position 只显示其中一格，不必每次抽卡嵌入整张图。
+图片尺寸都来自构建时写的 manifest（未构建时读文件头），运行时不需要 Pillow。
+"""
+import json
+import math
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+from asset_pipeline import ASSETS, image_size
+from config.catalogue import catalogue
+
+FOOD_ICONS = ASSETS / "food-icons"
+SPRITE = FOOD_ICONS / "sprite.png"
+ATLAS_DIR = Path(__file__).resolve().parent / "build" / "food-icons"
+ATLAS_IMAGE = ATLAS_DIR / "atlas.webp"
+ATLAS_MANIFEST = ATLAS_DIR / "atlas.json"
+
+# 图集每格边长（px）：结果卡片图标最大 64px，按 2 倍屏
+TILE = 128
+
+# sprite.png（1024×1024）里 8 格的裁剪框 (x, y, 边长)，顺序见 assets/README.md
+SPRITE_CELLS = {
+    "饭团": (173, 297, 174),
+    "鸡腿": (347, 307, 171),
+    "汉堡": (514, 297, 163),
+    "芝士汉堡": (690, 296, 175),
+    "咖啡": (153, 503, 207),
+    "甜品": (348, 549, 161),
+    "甜品2": (516, 548, 161),
+    "甜甜圈": (695, 548, 163),
+}
+# 菜品库里没填 "图标"（或格名不在上面）的品类显示这一格
+DEFAULT_CELL = "甜品"
+
+
+class IconTile(NamedTuple):
+    """一块图标：所在图片、裁剪框 (x, y, w, h) 与整张图片尺寸，供 CSS 按比例缩放定位。"""
+    path: Path
+    box: Tuple[int, int, int, int]
+    sheet: Tuple[int, int]
+
+    def css(self, size: int) -> dict:
+        """显示为 size 见方时的 background-size / background-position（px）。"""
+        x, y, w, h = self.box
+        sx, sy = size / w, size / h
+        return {
+            "size": size,
+            "bgW": round(self.sheet[0] * sx, 2),
+            "bgH": round(self.sheet[1] * sy, 2),
+            "bgX": round(-x * sx, 2),
+            "bgY": round(-y * sy, 2),
+        }
+
+    def sheet_width(self, size: int) -> int:
+        """显示为 size 见方时整张图片需要的宽度（px）= 图宽 × size / 格宽，用于按显示宽度选图片变体。"""
+        return math.ceil(self.sheet[0] * size / self.box[2])
+
+
+def _icon_file(key: str) -> Path:
+    """品类的单独图标文件名（品类名中的 / 换成 _）。"""
+    return FOOD_ICONS / (key.replace("/", "_") + ".png")
+
+
+def _keys(cat=None) -> dict:
+    """品类 → 没有单独图标时用的 sprite 格名（菜品库的 "图标" 优先，两种模式同名时取先出现的）。"""
+    cat = cat or catalogue()
+    cells = {}
+    for mode in ("减脂", "放纵"):
+        for key, entry in cat.foods(mode).items():
+            if key not in cells:
+                cells[key] = entry.图标 if entry.图标 in SPRITE_CELLS else DEFAULT_CELL
+    return cells
+
+
+def _atlas_index(cat=None) -> Optional[dict]:
+    """按图集 manifest 建索引；未构建、损坏或图片缺失时返回 None。"""
+    try:
+        manifest = json.loads(ATLAS_MANIFEST.read_text(encoding="utf-8"))
+        image = ATLAS_DIR / manifest["image"]
+        sheet = tuple(manifest["size"])
+        icons = manifest["icons"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not image.exists():
+        return None
+    index = {}
+    for key, cell in _keys(cat).items():
+        box = icons.get(_icon_file(key).stem) or icons.get(f"sprite:{cell}")
+        if box:
+            index[key] = IconTile(image, tuple(box), sheet)
+    return index
+
+
+def _source_index(cat=None) -> dict:
+    """没有图集时直接用源图：单品类图标整张显示，其余裁 sprite.png 的一格。"""
+    index = {}
+    sprite_size = image_size(SPRITE.relative_to(ASSETS).as_posix())
+    for key, cell in _keys(cat).items():
+        path = _icon_file(key)
+        size = image_size(path.relative_to(ASSETS).as_posix())
+        if size:
+            index[key] = IconTile(path, (0, 0) + size, size)
+        elif sprite_size:
+            x, y, side = SPRITE_CELLS[cell]
+            index[key] = IconTile(SPRITE, (x, y, side, side), sprite_size)
+    return index
+
+
+_index = None
+_index_mtime = None
+_index_catalogue = None
+_index_lock = threading.Lock()
+
+
+def icon_index() -> dict:
+    """品类 → IconTile；首次调用时建好，之后只在图集 manifest 变化（重新构建）或菜品库重新读入时重建。"""
+    global _index, _index_mtime, _index_catalogue
+    try:
+        mtime = ATLAS_MANIFEST.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    cat = catalogue()
+    with _index_lock:
+        if _index is None or mtime != _index_mtime or cat is not _index_catalogue:
+            _index = (_atlas_index(cat) if mtime is not None else None) or _source_index(cat)
+            _index_mtime = mtime
+            _index_catalogue = cat
+        return _index
+
+
+def food_icon(*keys: str) -> Optional[IconTile]:
+    """按顺序查第一个有图标的品类 / 菜品名。"""
+    index = icon_index()
+    for key in keys:
+        if key and key in index:
+            return index[key]
+    return None
+
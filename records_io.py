@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+消费记录导入/导出（CSV / JSONL）：按行流式处理，内存占用与记录条数无关。
+命令行用法（格式按扩展名判断，也可用 --format 指定；文件名写 - 表示标准输入/输出）：
+    python records_io.py export records.csv
+    python records_io.py import records.jsonl
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from typing import IO, Iterator, Optional
+
+from db import RECORD_FIELDS, insert_records, iter_records
+
+FORMATS = ("csv", "jsonl")
+
+
+def guess_format(filename: str) -> str:
+    """按扩展名判断格式，无法判断时按 CSV。"""
+    return "jsonl" if filename.lower().endswith((".jsonl", ".json")) else "csv"
+
+
+def iter_export(fmt: str, 用户: Optional[str] = None) -> Iterator[str]:
+    """逐行产出导出文本（用户 为 None 时导出全部用户）；CSV 带 BOM 与表头，便于 Excel 直接打开中文。"""
+    if fmt == "jsonl":
+        for rec in iter_records(用户=用户):
+            yield json.dumps(rec, ensure_ascii=False) + "\n"
+        return
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(RECORD_FIELDS)
+    yield "\ufeff" + buf.getvalue()
+    for rec in iter_records(用户=用户):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow([rec[f] for f in RECORD_FIELDS])
+        yield buf.getvalue()
+
+
+def iter_import(fp: IO[str], fmt: str) -> Iterator[dict]:
+    """从文本流逐条读出记录 dict（CSV 需含表头，JSONL 每行一个对象，空行跳过）。"""
+    if fmt == "jsonl":
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+        return
+    yield from csv.DictReader(fp)
+
+
+def export_records(fp: IO[str], fmt: str, 用户: Optional[str] = None) -> None:
+    fp.writelines(iter_export(fmt, 用户))
+
+
+def import_records(fp: IO[str], fmt: str, 用户: Optional[str] = None) -> int:
+    """
+    导入全部记录（同一事务内分批写入），返回条数；有无效记录时抛 ValueError 且不写入任何一条。
+    用户 不为 None 时全部记到该用户名下，否则沿用文件里的 用户 列。
+    """
+    return insert_records(iter_import(fp, fmt), 用户=用户)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="消费记录导入/导出（CSV / JSONL）")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("file", help="文件路径，- 表示标准输入/输出")
+    parser.add_argument("--format", choices=FORMATS, help="默认按扩展名判断")
+    parser.add_argument("--user", help="只导出该用户的记录 / 导入时全部记到该用户名下；默认全部用户 / 沿用文件里的 用户 列")
+    args = parser.parse_args(argv)
+    fmt = args.format or guess_format(args.file)
+
+    if args.command == "export":
+        if args.file == "-":
+            export_records(sys.stdout, fmt, args.user)
+        else:
+            with open(args.file, "w", encoding="utf-8", newline="") as fp:
+                export_records(fp, fmt, args.user)
+        return 0
+
+    try:
+        if args.file == "-":
+            count = import_records(sys.stdin, fmt, args.user)
+        else:
+            with open(args.file, "r", encoding="utf-8-sig", newline="") as fp:
+                count = import_records(fp, fmt, args.user)
+    except ValueError as e:
+        print(f"导入失败，未写入任何记录：{e}", file=sys.stderr)
+        return 1
+    print(f"已导入 {count} 条记录", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
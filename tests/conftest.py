@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""测试公共夹具：每个用例用临时目录下的新数据库，不碰 data/records.db。"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """把 db.DB_PATH 指到临时文件并迁移到最新版本，用例结束后关闭连接池。"""
+    db.close_db()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "records.db")
+    db.init_db()
+    yield db
+    db.close_db()
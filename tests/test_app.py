@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""app.py：每个用户操作（按钮、查询参数、组件事件）只触发一次脚本运行，不再 st.rerun()。"""
+import pytest
+
+from conftest import ROOT
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+
+@pytest.fixture
+def app(fresh_db):
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=30)
+    at.run()
+    assert not at.exception, at.exception
+    return at
+
+
+class _Runs:
+    """按 session_state.script_runs 断言每步只多运行一次。"""
+
+    def __init__(self, at):
+        self.at = at
+        self.last = at.session_state["script_runs"]
+
+    def step(self, name, action):
+        action()
+        self.at.run()
+        assert not self.at.exception, (name, self.at.exception)
+        runs = self.at.session_state["script_runs"]
+        assert runs - self.last == 1, f"{name}: {runs - self.last} 次运行"
+        self.last = runs
+
+
+def test_each_action_runs_script_once(app):
+    at = app
+    runs = _Runs(at)
+
+    def query(**params):
+        return lambda: [at.query_params.__setitem__(k, v) for k, v in params.items()]
+
+    def click(key):
+        return lambda: at.button(key=key).click()
+
+    def event(**value):
+        return lambda: at.session_state.__setitem__("gashapon", value)
+
+    runs.step("?mode=indulge", query(mode="indulge"))
+    assert at.session_state["mode"] == "放纵"
+    runs.step("?action=record", query(action="record", uid="test_user"))
+    assert at.session_state["show_record_form"] and at.session_state["user_id"] == "test_user"
+    at.number_input(key="record_amount").set_value(23.5)
+    runs.step("保存记录", click("btn_save"))
+    assert at.session_state["success_message"]
+    runs.step("返回首页", click("btn_home_after_save"))
+
+    runs.step("?action=recap", query(action="recap"))
+    assert at.session_state["show_recap"]
+    edit_key = next(b.key for b in at.button if b.key.startswith("recap_edit_"))
+    runs.step("编辑", click(edit_key))
+    at.number_input(key="edit_amount").set_value(30.0)
+    runs.step("保存修改", lambda: next(b for b in at.button if b.label == "保存修改").click())
+    assert "¥30.0" in "".join(m.value for m in at.markdown)
+    runs.step("删除", click(edit_key.replace("edit", "del")))
+    runs.step("确认删除", click("confirm_del"))
+    runs.step("返回首页", click("btn_back"))
+    assert not at.session_state["show_recap"]
+
+    runs.step("?draw=1", query(draw="1"))
+    assert at.session_state["show_modal"] and at.session_state["result"]
+    runs.step("就吃这个", click("btn_confirm"))
+    assert at.session_state["show_record_form"]
+    runs.step("取消记录", click("btn_cancel_record"))
+
+    runs.step("?draw=1", query(draw="1"))
+    runs.step("再抽一次", click("btn_again"))
+    # 回到首页扭蛋机播放新结果（只送一次），结果弹窗在页面内
+    assert not at.session_state["show_modal"] and at.session_state["gashapon_reply"] is None
+    tid = at.session_state["draw_tid"]
+    runs.step("页面内就吃这个", event(action="record", tid=tid, id="r1"))
+    assert at.session_state["show_record_form"]
+    runs.step("取消记录", click("btn_cancel_record"))
+
+    runs.step("组件切换模式", event(action="mode", mode="减脂", id="m1"))
+    assert at.session_state["mode"] == "减脂"
+    runs.step("组件抽卡", event(action="draw", id="d1"))
+    assert at.session_state["gashapon_reply"]["id"] == "d1"
+    runs.step("组件进入本周总计", event(action="nav", view="recap", id="n1"))
+    assert at.session_state["show_recap"]
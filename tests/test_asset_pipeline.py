@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""asset_pipeline：每页图片字节数统计；构建后首页与抽卡结果页发送的字节数都比原图少。"""
+import multiprocessing
+
+import pytest
+
+import asset_pipeline
+import icon_atlas
+
+
+@pytest.fixture
+def build_dir(tmp_path, monkeypatch):
+    """构建输出（变体、manifest、图集）都写到临时目录。"""
+    monkeypatch.setattr(asset_pipeline, "BUILD_DIR", tmp_path / "assets")
+    monkeypatch.setattr(asset_pipeline, "MANIFEST", tmp_path / "assets" / "manifest.json")
+    monkeypatch.setattr(icon_atlas, "ATLAS_DIR", tmp_path / "food-icons")
+    monkeypatch.setattr(icon_atlas, "ATLAS_IMAGE", tmp_path / "food-icons" / "atlas.webp")
+    monkeypatch.setattr(icon_atlas, "ATLAS_MANIFEST", tmp_path / "food-icons" / "atlas.json")
+    return tmp_path
+
+
+def test_page_bytes_without_build_sends_originals(build_dir):
+    pages = asset_pipeline.page_bytes()
+    home_src = sum((asset_pipeline.ASSETS / p).stat().st_size for p, _ in asset_pipeline.HOME_IMAGES)
+    assert pages["首页"] == (home_src, home_src)
+    sprite = icon_atlas.SPRITE.stat().st_size
+    assert pages["抽卡结果"] == (home_src + sprite, home_src + sprite)
+    assert pages["本周总结"] == (0, 0)
+
+
+def test_build_shrinks_every_page(build_dir, capsys):
+    pytest.importorskip("PIL")
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("构建子进程不继承临时目录的 monkeypatch，会写到真实的 build/")
+    assert asset_pipeline.main(["--workers", "1"]) == 0
+    assert icon_atlas.ATLAS_MANIFEST.exists()
+    pages = asset_pipeline.page_bytes()
+    for page in ("首页", "抽卡结果"):
+        src, sent = pages[page]
+        assert 0 < sent < src / 4, (page, src, sent)
+    out = capsys.readouterr().out
+    assert "首页" in out and "抽卡结果" in out and "本周总结：无图片" in out
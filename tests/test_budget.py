@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""budget：本周热量超过目标后只抽下限放得进剩余热量的品类并封顶热量；默认关闭；缓存随 records_generation 失效。"""
+import random
+
+import pytest
+
+import budget
+from config.foods import alias_table, draw, foods
+
+TARGET = 7000
+
+
+@pytest.fixture
+def on(fresh_db, monkeypatch):
+    """开启 7000 kcal 的周目标，缓存清空。"""
+    monkeypatch.setattr(budget, "WEEKLY_CALORIE_TARGET", TARGET)
+    monkeypatch.setattr(budget, "WEEKLY_SPEND_TARGET", 0)
+    budget.clear()
+    yield budget
+    budget.clear()
+
+
+def _draws(mode, 用户, n=2000, seed=3):
+    table, cap = budget.table_for(mode, 用户)
+    rng = random.Random(seed)
+    return table, cap, [draw(mode, rng, table, cap) for _ in range(n)]
+
+
+def test_off_by_default(fresh_db, monkeypatch):
+    monkeypatch.setattr(budget, "WEEKLY_CALORIE_TARGET", 0)
+    monkeypatch.setattr(budget, "WEEKLY_SPEND_TARGET", 0)
+    fresh_db.save_record("外卖消费", 80, 9000, "放纵", "炸鸡", "alice")
+    assert budget.remaining("alice") is None
+    assert budget.table_for("减脂", "alice") == (alias_table("减脂"), None)
+
+
+def test_remaining_300_only_draws_categories_that_fit(on, fresh_db):
+    fresh_db.save_record("外卖消费", 30, TARGET - 300, "减脂", "其他", "alice")
+    table, cap, results = _draws("减脂", "alice")
+    assert cap == 300
+    fits = {k for k, e in foods("减脂").items() if e.热量下限 <= 300}
+    assert fits and set(table.keys) == fits
+    assert {r["品类"] for r in results} <= fits
+    assert max(r["热量"] for r in results) <= 300
+    # 别的用户不受影响
+    assert budget.table_for("减脂", "bob") == (alias_table("减脂"), TARGET)
+
+
+def test_indulge_capped_to_lower_bound(on, fresh_db):
+    fresh_db.save_record("外卖消费", 30, TARGET - 300, "减脂", "其他", "alice")
+    _, cap, results = _draws("放纵", "alice")
+    assert cap == 300
+    lows = {k: e.热量下限 for k, e in foods("放纵").items()}
+    assert min(lows.values()) == 500
+    assert all(r["热量"] == lows[r["品类"]] == 500 for r in results)
+
+
+def test_cache_follows_records_generation(on, fresh_db):
+    start = budget.stats()
+
+    def grew(key):
+        return budget.stats()[key] - start[key]
+
+    assert budget.remaining("alice") == TARGET
+    assert budget.remaining("alice") == TARGET
+    assert grew("loads") == 1 and grew("hits") == 1
+
+    # 本进程保存后 note_saved 直接累加，不重新查询
+    fresh_db.save_record("外卖消费", 30, 400, "减脂", "其他", "alice")
+    budget.note_saved("alice", 400, 30)
+    assert budget.remaining("alice") == TARGET - 400
+    assert grew("loads") == 1 and grew("increments") == 1
+
+    # 其他写入（没有 note_saved）让 records_generation 对不上，下次重新读取
+    rid = fresh_db.get_week_records("alice")[0]["id"]
+    fresh_db.delete_record(rid, "alice")
+    assert budget.remaining("alice") == TARGET
+    assert grew("loads") == 2
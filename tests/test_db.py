@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""db.py：查询计划、迁移与并发读写。"""
+import sqlite3
+from contextlib import contextmanager
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params=()) -> str:
+    return "\n".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def _executed(db, monkeypatch, fn) -> list:
+    """调用 fn，返回期间经 db._read() 执行的 SQL（参数已代入），即应用实际发出的查询。"""
+    statements = []
+    read = db._read
+
+    @contextmanager
+    def traced():
+        with read() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                yield conn
+            finally:
+                conn.set_trace_callback(None)
+
+    monkeypatch.setattr(db, "_read", traced)
+    fn()
+    monkeypatch.setattr(db, "_read", read)
+    return statements
+
+
+def test_request_queries_search_indexes(fresh_db, monkeypatch):
+    """页面每次请求发出的查询（周统计、明细分页含翻页、最近吃过的品类、单条记录、日期范围统计）都按索引定位，不扫表、不另排序。"""
+    _bulk(fresh_db, 200)
+    cursor = fresh_db.get_records_page(limit=20, start="2026-01-01", end="2026-12-31", 用户="u")[1]
+
+    def requests():
+        fresh_db.get_week_stats("u")
+        fresh_db.get_records_page(用户="u")
+        fresh_db.get_records_page(cursor, limit=20, start="2026-01-01", end="2026-12-31", 用户="u")
+        fresh_db.get_records_page(cursor, start="2026-01-01", end="2026-12-31", 模式="减脂", 用户="u")
+        fresh_db.get_last_eaten("u", "2026-01-01")
+        fresh_db.get_record_by_id(1, "u")
+        fresh_db.get_range_stats("2026-01-01", "2026-12-31", "month", 用户="u")
+
+    statements = _executed(fresh_db, monkeypatch, requests)
+    assert len(statements) == 7, statements
+    with fresh_db._read() as conn:
+        plans = {sql: _plan(conn, sql) for sql in statements}
+    for sql, plan in plans.items():
+        assert "SEARCH" in plan and "SCAN" not in plan, (sql, plan)
+    pages = [plan for sql, plan in plans.items() if "ORDER BY 创建时间, id" in sql]
+    assert len(pages) == 3
+    for plan in pages:
+        assert "USING INDEX idx_records_user_created " in plan and "TEMP B-TREE" not in plan, plan
+    last_eaten = next(plan for sql, plan in plans.items() if "MAX(创建时间)" in sql)
+    assert "USING COVERING INDEX idx_records_user_category_created" in last_eaten, last_eaten
+
+
+def test_no_unused_records_indexes(fresh_db):
+    """records 上只保留上面这些查询用得到的索引：每多一个索引，每次写入都多维护一份。"""
+    with fresh_db._read() as conn:
+        indexes = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'records' AND sql IS NOT NULL"
+        )}
+    assert indexes == {"idx_records_user_created", "idx_records_user_category_created"}
+
+
+def _migrate_to(path, version: int) -> sqlite3.Connection:
+    """按 db._MIGRATIONS 的前 version 个迁移建库，模拟停在旧版本的数据库。"""
+    import db
+
+    conn = sqlite3.connect(str(path))
+    for number, migration in enumerate(db._MIGRATIONS[:version], start=1):
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {number}")
+    conn.commit()
+    return conn
+
+
+def _triggers(conn) -> set:
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+
+
+def _legacy_insert(conn, 创建时间: str, 金额: float = 20.0, 热量: int = 500) -> None:
+    conn.execute(
+        "INSERT INTO records (菜品名, 金额, 热量, 模式, 品类, 创建时间, 区间) VALUES ('a', ?, ?, '减脂', '日料', ?, '工作日')",
+        (金额, 热量, 创建时间),
+    )
+
+
+def test_upgrade_from_weekly_summary_triggers_does_not_double_count(tmp_path, monkeypatch):
+    """迁移 5 建的 trg_records_weekly_* 触发器在迁移 8 按同一名字换成按用户分区的版本：只有一套，周汇总与明细一致。"""
+    import db
+
+    path = tmp_path / "v5.db"
+    conn = _migrate_to(path, 5)
+    assert {"trg_records_weekly_insert", "trg_records_weekly_delete", "trg_records_weekly_update"} <= _triggers(conn)
+    _legacy_insert(conn, "2026-10-13 12:00:00")
+    conn.commit()
+    conn.close()
+
+    db.close_db()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    try:
+        db.init_db()
+        db.insert_records([{"菜品名": "b", "金额": 30, "热量": 600, "模式": "放纵", "品类": "炸鸡", "创建时间": "2026-10-14 12:00:00"}])
+        with db._read() as conn:
+            assert _triggers(conn) == set(db._trigger_names("weekly_summary") + db._trigger_names("daily_rollup"))
+            rows = conn.execute("SELECT 次数, 金额 FROM weekly_summary WHERE 周起始 = '2026-10-12'").fetchall()
+        assert [tuple(r) for r in rows] == [(2, 50.0)]
+        assert db.check_weekly_summary() == []
+    finally:
+        db.close_db()
+
+
+def _bulk(db, n: int, 用户: str = "u", same_second: int = 1) -> None:
+    """n 条 2026 年内的记录，每 same_second 条共用同一个 创建时间（测试游标在同一秒内的 id 比较）。"""
+    from datetime import datetime, timedelta
+
+    t0 = datetime(2026, 1, 1)
+    db.insert_records(
+        (
+            {
+                "菜品名": f"r{i}", "金额": 10, "热量": 300, "模式": "减脂", "品类": "日料",
+                "创建时间": (t0 + timedelta(minutes=i // same_second)).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for i in range(n)
+        ),
+        用户=用户,
+    )
+    db.insert_records([{"菜品名": "x", "金额": 1, "热量": 1, "模式": "减脂", "品类": "日料", "创建时间": "2026-03-01 00:00:00"}], 用户="other")
+
+
+def test_records_page_cursor_walks_every_row_once(fresh_db):
+    _bulk(fresh_db, 250, same_second=3)
+    seen, cursor = [], None
+    while True:
+        page, cursor = fresh_db.get_records_page(cursor, limit=20, start="2026-01-01", end="2026-12-31", 用户="u")
+        seen.extend((r["创建时间"], r["id"]) for r in page)
+        if cursor is None:
+            break
+    assert len(seen) == 250 and seen == sorted(set(seen))
+
+
+def test_records_page_and_range_stats_include_both_end_dates(fresh_db):
+    """start / end 只看日期、含首尾两天：末日 12:00、23:59:59 的记录都在，次日 00:00 的不在；两个接口对同一范围计数一致。"""
+    rows = [
+        ("2026-09-30 23:59:59", "前一天"),
+        ("2026-10-01 00:00:00", "首日"),
+        ("2026-12-31 12:00:00", "末日中午"),
+        ("2026-12-31 23:59:59", "末日最后一秒"),
+        ("2027-01-01 00:00:00", "次日"),
+    ]
+    fresh_db.insert_records(
+        [{"菜品名": name, "金额": 10, "热量": 300, "模式": "减脂", "品类": "日料", "创建时间": t} for t, name in rows],
+        用户="u",
+    )
+    for start, end in (("2026-10-01", "2026-12-31"), ("2026-10-01 08:00:00", "2026-12-31 00:00:00")):
+        page, cursor = fresh_db.get_records_page(None, 100, start, end, 用户="u")
+        assert [r["菜品名"] for r in page] == ["首日", "末日中午", "末日最后一秒"] and cursor is None
+        stats = fresh_db.get_range_stats(start, end, "month", 用户="u")
+        assert sum(r["用餐次数"] for r in stats) == len(page)
+    # 游标翻到最后一页时同样含末日
+    page, cursor = fresh_db.get_records_page(None, 2, "2026-10-01", "2026-12-31", 用户="u")
+    assert fresh_db.get_records_page(cursor, 2, "2026-10-01", "2026-12-31", 用户="u")[0][0]["菜品名"] == "末日最后一秒"
+
+
+def test_records_page_deep_page_costs_same_as_first(fresh_db):
+    """游标直接作为索引范围起点：第 1 页与第 250 页执行的 VM 指令数相同量级（偏移式分页会随页深线性增长）。"""
+    _bulk(fresh_db, 5000)
+    conn = sqlite3.connect(str(fresh_db.DB_PATH))
+    steps = [0]
+
+    def count():
+        steps[0] += 1
+        return 0
+
+    conn.set_progress_handler(count, 1)
+
+    def cost(after):
+        steps[0] = 0
+        sql, params = fresh_db._records_page_query(after, 20, "2026-01-01", "2026-12-31", None, None, "u")
+        rows = conn.execute(sql, params).fetchall()
+        assert len(rows) == 21
+        return steps[0]
+
+    deep = conn.execute("SELECT 创建时间, id FROM records WHERE 用户 = 'u' ORDER BY 创建时间, id LIMIT 1 OFFSET 4900").fetchone()
+    first, last = cost(None), cost(tuple(deep))
+    conn.close()
+    assert last < first * 2, (first, last)
+
+
+def test_concurrent_reads_and_writes(fresh_db):
+    """
+    WAL + busy_timeout + 只读连接池：50 个线程同时写、50 个线程同时读，
+    不出现 database is locked，读到的本周次数只增不减，最终计数与汇总一致。
+    多进程版本见 bench/db_concurrency.py。
+    """
+    import threading
+
+    writers, readers, per_writer = 50, 50, 20
+    errors = []
+    done = threading.Event()
+
+    def write(n: int) -> None:
+        try:
+            for i in range(per_writer):
+                if i % 10 == 9:
+                    fresh_db.insert_records(
+                        [{"菜品名": "批量", "金额": 1, "热量": 100, "模式": "减脂", "品类": "日料",
+                          "创建时间": fresh_db._week_bounds()[0]}],
+                        用户=f"u{n}",
+                    )
+                else:
+                    fresh_db.save_record("单条", 1.0, 100, "减脂", "日料", f"u{n}")
+        except Exception as e:  # noqa: BLE001 - 收集到主线程里断言
+            errors.append(e)
+
+    def read(n: int) -> None:
+        last = 0
+        try:
+            while not done.is_set():
+                count = fresh_db.get_week_stats(f"u{n % writers}")["总用餐次数"]
+                assert count >= last, (count, last)
+                last = count
+                fresh_db.get_records_page(用户=f"u{n % writers}")
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    write_threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    read_threads = [threading.Thread(target=read, args=(n,)) for n in range(readers)]
+    for t in read_threads + write_threads:
+        t.start()
+    for t in write_threads:
+        t.join(timeout=60)
+    done.set()
+    for t in read_threads:
+        t.join(timeout=60)
+
+    assert not errors, errors
+    for n in range(writers):
+        assert fresh_db.get_week_stats(f"u{n}")["总用餐次数"] == per_writer
+    with fresh_db._read() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM records").fetchone()[0] == writers * per_writer
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert fresh_db.check_weekly_summary() == []
+
+
+def _upgrade_legacy_db(tmp_path, monkeypatch):
+    """迁移 7 的库（还没有 用户 列）里有本周两条旧记录，再升级到最新版本。"""
+    import db
+
+    path = tmp_path / "v7.db"
+    conn = _migrate_to(path, 7)
+    week_start = db._week_bounds()[0]
+    _legacy_insert(conn, week_start, 20.0, 500)
+    _legacy_insert(conn, week_start, 30.0, 700)
+    conn.commit()
+    conn.close()
+    db.close_db()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.init_db()
+    return db, week_start[:10]
+
+
+def test_legacy_rows_visible_after_upgrade(tmp_path, monkeypatch):
+    """升级后第一个带用户 ID 的会话认领旧记录：周统计、明细分页与日期范围统计都能看到。"""
+    db, day = _upgrade_legacy_db(tmp_path, monkeypatch)
+    try:
+        assert db.count_legacy_records() == 2
+        assert db.claim_legacy_records("browser-1", only_if_unclaimed=True) == 2
+        stats = db.get_week_stats("browser-1")
+        assert (stats["总用餐次数"], stats["总消费"], stats["总热量"]) == (2, 50.0, 1200)
+        assert len(db.get_records_page(用户="browser-1")[0]) == 2
+        assert db.get_range_stats(day, day, 用户="browser-1")[0]["用餐次数"] == 2
+        assert db.get_week_stats("")["总用餐次数"] == 0
+        assert db.count_legacy_records() == 0
+        assert db.check_weekly_summary() == []
+        # 之后新来的浏览器不会再自动认领（也没有可认领的了）
+        assert db.claim_legacy_records("browser-2", only_if_unclaimed=True) == 0
+    finally:
+        db.close_db()
+
+
+def test_legacy_rows_not_auto_claimed_once_users_exist(tmp_path, monkeypatch):
+    """库里已有别的用户的记录时不自动归属旧记录，只能显式认领。"""
+    db, _ = _upgrade_legacy_db(tmp_path, monkeypatch)
+    try:
+        db.save_record("新", 10.0, 300, "减脂", "日料", "browser-2")
+        assert db.claim_legacy_records("browser-1", only_if_unclaimed=True) == 0
+        assert db.get_week_stats("browser-1")["总用餐次数"] == 0
+        assert db.claim_legacy_records("browser-1") == 2
+        assert db.get_week_stats("browser-1")["总用餐次数"] == 2
+        assert db.get_week_stats("browser-2")["总用餐次数"] == 1
+        assert db.check_weekly_summary() == []
+    finally:
+        db.close_db()
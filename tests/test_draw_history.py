@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""draw_history：最近吃过的品类降低抽中概率，窗口过后恢复，按用户分别计算；默认关闭。"""
+import random
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+import draw_history
+from config.foods import alias_table, draw
+
+MODE = "减脂"
+N = 20000
+
+
+@pytest.fixture
+def history(fresh_db, monkeypatch):
+    """开启 3 天的推荐模式，缓存清空。"""
+    monkeypatch.setattr(draw_history, "RECENT_DAYS", 3)
+    draw_history.clear()
+    yield draw_history
+    draw_history.clear()
+
+
+def _eat(db, 用户, 品类, days_ago):
+    created = datetime.combine(date.today() - timedelta(days=days_ago), time(12))
+    db.insert_records([{
+        "菜品名": 品类, "金额": 20, "热量": 400, "模式": MODE, "品类": 品类,
+        "创建时间": created.isoformat(sep=" "), "用户": 用户,
+    }])
+
+
+def _later(monkeypatch, days):
+    """把 draw_history 看到的「今天」往后拨 days 天。"""
+    today = date.today() + timedelta(days=days)
+
+    class _Date(date):
+        @classmethod
+        def today(cls):
+            return today
+
+    monkeypatch.setattr(draw_history, "date", _Date)
+
+
+def _share(用户, 品类, seed=7):
+    """同一种子下抽 N 次，品类 被抽中的比例。"""
+    rng = random.Random(seed)
+    table = draw_history.table_for(MODE, 用户)
+    return Counter(draw(MODE, rng, table)["品类"] for _ in range(N))[品类] / N
+
+
+def _target():
+    base = alias_table(MODE)
+    return max(zip(base.keys, base.weights), key=lambda kw: kw[1])[0]
+
+
+def test_recent_category_drops_then_recovers(history, fresh_db, monkeypatch):
+    target = _target()
+    before = _share("alice", target)
+    assert before > 0.02
+
+    _eat(fresh_db, "alice", target, days_ago=0)
+    today = _share("alice", target)
+    assert today < before * 0.3
+    # 同一种子、同样的降权表，结果可重放
+    assert _share("alice", target) == today
+
+    _later(monkeypatch, 2)
+    assert draw_history.recency("alice") == {target: 2}
+    assert today < _share("alice", target) < before
+
+    _later(monkeypatch, 3)
+    assert draw_history.recency("alice") == {}
+    assert draw_history.table_for(MODE, "alice") is alias_table(MODE)
+    assert _share("alice", target) == before
+
+
+def test_recency_is_per_user(history, fresh_db):
+    target = _target()
+    _eat(fresh_db, "alice", target, days_ago=0)
+    assert draw_history.recency("alice") == {target: 0}
+    assert draw_history.recency("bob") == {}
+    assert draw_history.table_for(MODE, "bob") is alias_table(MODE)
+    assert _share("bob", target) > _share("alice", target) * 3
+
+
+def test_off_by_default_keeps_base_table(fresh_db, monkeypatch):
+    monkeypatch.setattr(draw_history, "RECENT_DAYS", 0)
+    draw_history.clear()
+    _eat(fresh_db, "alice", _target(), days_ago=0)
+    assert draw_history.recency("alice") == {}
+    assert draw_history.table_for(MODE, "alice") is alias_table(MODE)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""draw_store：进程内 LRU 有界、过期即丢、未命中按表里的到期时间回填；db 里的表由后台清理删过期与超量的行。"""
+import time
+import tracemalloc
+
+import pytest
+
+import draw_store
+
+
+@pytest.fixture
+def lru(fresh_db, monkeypatch):
+    """每个用例一个空的进程内 LRU。"""
+    cache = draw_store._DrawLRU(draw_store.LRU_SIZE)
+    monkeypatch.setattr(draw_store, "_lru", cache)
+    return cache
+
+
+def _result(i: int) -> dict:
+    return {"品类": "日料", "菜品名": f"r{i}", "热量": 300 + i, "模式": "减脂"}
+
+
+def test_lru_stays_at_limit(lru):
+    n = draw_store.LRU_SIZE + 200
+    for i in range(n):
+        draw_store.save(f"t{i}", _result(i))
+    stats = draw_store.stats()
+    assert stats["entries"] == draw_store.LRU_SIZE
+    assert stats["evictions"] == n - draw_store.LRU_SIZE
+    # 被淘汰的最早几条仍能从表里取回（并回填），LRU 依旧不超过上限
+    assert draw_store.load("t0") == _result(0)
+    assert draw_store.stats()["entries"] == draw_store.LRU_SIZE
+
+
+def test_lru_memory_constant_over_100k_draws():
+    """
+    10 万次抽卡（每次存一条新结果再取回）后条数仍为 LRU_SIZE，内存不随次数增长：
+    前 1 万次后所有条目都已换过一轮，之后 9 万次的占用与峰值都与此时持平（不设上限的 dict 约 36 MB）。
+    """
+    cache = draw_store._DrawLRU(draw_store.LRU_SIZE)
+    expires = time.time() + 3600
+
+    def draw(start: int, stop: int) -> None:
+        for i in range(start, stop):
+            cache.put(f"t{i}", _result(i), expires)
+            assert cache.get(f"t{i}") is not None
+
+    tracemalloc.start()
+    try:
+        draw(0, 10_000)
+        warm, _ = tracemalloc.get_traced_memory()
+        draw(10_000, 100_000)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert cache.stats()["entries"] == draw_store.LRU_SIZE
+    assert cache.stats()["evictions"] == 100_000 - draw_store.LRU_SIZE
+    assert warm < 2 * 1024 * 1024, warm
+    assert current - warm < 32 * 1024, (warm, current)
+    assert peak < warm + 256 * 1024, (warm, peak)
+
+
+def test_expired_entries_are_dropped(lru):
+    lru.put("gone", _result(1), time.time() - 1)
+    assert draw_store.load("gone") is None
+    assert "gone" not in lru._entries
+    # 表里已过期的结果也不返回、不回填
+    draw_store.put_draw_result("stale", _result(2), ttl=-1)
+    assert draw_store.load("stale") is None
+    assert "stale" not in lru._entries
+
+
+def test_miss_backfills_with_row_expiry(lru):
+    draw_store.put_draw_result("other-process", _result(3), ttl=120)
+    result, expires = draw_store.get_draw_result("other-process", with_expiry=True)
+    assert "other-process" not in lru._entries
+    assert draw_store.load("other-process") == result
+    assert lru._entries["other-process"] == (expires, result)
+    assert draw_store.stats()["misses"] == 1
+    assert draw_store.load("other-process") == result
+    assert draw_store.stats()["hits"] == 1
+
+
+def test_delete_removes_both_copies(lru):
+    draw_store.save("t", _result(4))
+    draw_store.delete("t")
+    assert "t" not in lru._entries
+    assert draw_store.get_draw_result("t") is None
+
+
+def _rows(db) -> list:
+    with db._read() as conn:
+        return [r[0] for r in conn.execute("SELECT tid FROM draw_results ORDER BY 到期")]
+
+
+def test_sweep_deletes_expired_rows(fresh_db):
+    now = time.time()
+    for i in range(3):
+        fresh_db.put_draw_result(f"old{i}", _result(i), ttl=-1)
+    for i in range(2):
+        fresh_db.put_draw_result(f"live{i}", _result(i), ttl=100 + i)
+    before = fresh_db.draw_store_stats()
+    assert fresh_db.sweep_draw_results(now=now) == (3, 0)
+    assert _rows(fresh_db) == ["live0", "live1"]
+    after = fresh_db.draw_store_stats()
+    assert after["expired"] - before["expired"] == 3 and after["entries"] == 2
+
+
+def test_sweep_evicts_earliest_expiring_rows_over_cap(fresh_db):
+    for i in range(10):
+        fresh_db.put_draw_result(f"t{i}", _result(i), ttl=100 + i)
+    assert fresh_db.sweep_draw_results(max_entries=4) == (0, 6)
+    assert _rows(fresh_db) == ["t6", "t7", "t8", "t9"]
+    # 过期与超量同时存在：先删过期的，再按到期先后削到上限
+    fresh_db.put_draw_result("stale", _result(0), ttl=-1)
+    assert fresh_db.sweep_draw_results(max_entries=3) == (1, 1)
+    assert _rows(fresh_db) == ["t7", "t8", "t9"]
+
+
+def test_background_sweeper_caps_table(fresh_db, monkeypatch):
+    """写入满 DRAW_RESULT_SWEEP_EVERY 条即唤醒后台清理，不用等 DRAW_RESULT_SWEEP_INTERVAL。"""
+    monkeypatch.setattr(fresh_db, "DRAW_RESULT_MAX", 5)
+    monkeypatch.setattr(fresh_db, "DRAW_RESULT_SWEEP_EVERY", 8)
+    # 写到 puts 计数恰为 8 的倍数（唤醒点），且至少超出上限一条
+    n = 8 - fresh_db.draw_store_stats()["puts"] % 8
+    for i in range(n if n > 5 else n + 8):
+        fresh_db.put_draw_result(f"t{i}", _result(i), ttl=100 + i)
+    deadline = time.time() + 10
+    while len(_rows(fresh_db)) > 5 and time.time() < deadline:
+        time.sleep(0.05)
+    assert len(_rows(fresh_db)) == 5
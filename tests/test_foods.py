@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""config.foods：改 foods.json 后 foods()、别名表与旧版常量视图都换成新菜品库；旧版常量与原先的值一致且只读。"""
+import json
+
+import pytest
+
+import config.foods as foods_module
+from config import catalogue
+from config.foods import alias_table, foods
+
+
+@pytest.fixture
+def foods_file(tmp_path, monkeypatch):
+    """把发布的 foods.json 复制到临时目录并指向它，用例结束后换回原文件。"""
+    path = tmp_path / "foods.json"
+    path.write_text(catalogue.FOODS_FILE.read_text(encoding="utf-8"), encoding="utf-8")
+    monkeypatch.setattr(catalogue, "FOODS_FILE", path)
+    catalogue.reload()
+    yield path
+    monkeypatch.undo()
+    catalogue.reload()
+
+
+def test_legacy_names_match_shipped_catalogue():
+    catalogue.reload()
+    assert len(foods_module.DIET_FOODS) == 20 and len(foods_module.INDULGE_FOODS) == 25
+    assert foods_module.DIET_FOODS["麦当劳"]["搭配"].startswith("双吉士汉堡")
+    assert foods_module.INDULGE_FOODS["炸鸡"]["快乐提示"] == "今天开心最重要，不用控制！"
+    assert foods_module.DIET_CATEGORY_MAP["老乡鸡"] == "中式快餐类"
+    assert foods_module.DIET_CALORIE_BY_CATEGORY["快餐连锁类"] == (250, 400)
+    assert dict(foods_module.DIET_CALORIE_OVERRIDE) == {"赛百味": (200, 400)}
+    assert foods_module.INDULGE_CALORIE_RANGE == (500, 1200)
+    with pytest.raises(TypeError):
+        foods_module.DIET_FOODS["新店"] = {}
+    with pytest.raises(TypeError):
+        foods_module.DIET_FOODS["麦当劳"]["搭配"] = "x"
+    with pytest.raises(AttributeError):
+        foods_module.NO_SUCH_NAME
+
+
+def test_hot_reload_updates_foods_alias_table_and_legacy_views(foods_file):
+    assert "楼下轻食" not in foods("减脂")
+    old_table = alias_table("减脂")
+    old_map = foods_module.DIET_CATEGORY_MAP
+    assert foods_module.DIET_CATEGORY_MAP is old_map  # 同一版菜品库只算一次
+
+    doc = json.loads(foods_file.read_text(encoding="utf-8"))
+    doc["减脂"]["菜品"].append({"品类": "楼下轻食", "分类": "轻食・健康餐类", "搭配": "鸡胸沙拉", "注意事项": ["少酱"]})
+    doc["减脂"]["分类热量"]["轻食・健康餐类"] = [150, 350]
+    doc["放纵"]["默认热量"] = [600, 1300]
+    foods_file.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    catalogue.reload()
+
+    entry = foods("减脂")["楼下轻食"]
+    assert (entry.热量下限, entry.热量上限) == (150, 350)
+    table = alias_table("减脂")
+    assert table is not old_table and "楼下轻食" in table.keys and table.n == old_table.n + 1
+    assert foods_module.DIET_FOODS["楼下轻食"] == {"搭配": "鸡胸沙拉", "注意事项": ("少酱",)}
+    assert foods_module.DIET_CATEGORY_MAP["楼下轻食"] == "轻食・健康餐类"
+    assert foods_module.DIET_CALORIE_BY_CATEGORY["轻食・健康餐类"] == (150, 350)
+    assert foods_module.INDULGE_CALORIE_RANGE == (600, 1300)
+    assert "楼下轻食" not in old_map
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""gashapon_component：build/ 可写时写组件页并走双向组件；只读时导入与渲染都不报错，改为内嵌整页。"""
+import subprocess
+import sys
+
+import pytest
+
+import gashapon_component as gc
+from conftest import ROOT
+
+MODES = {"减脂": {"icon": "🥗", "badge": "#2d8a7a", "bg": "#4ECDC4", "color": "#fff"},
+         "放纵": {"icon": "🍟", "badge": "#d35400", "bg": "#E74C3C", "color": "#fff"}}
+IDLE = {"bg": "#EAECEE", "color": "#333"}
+
+
+class _Calls:
+    def __init__(self):
+        self.html = []
+        self.component = []
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """替换 components.html 与已声明的组件，只记录调用参数。"""
+    calls = _Calls()
+    monkeypatch.setattr(gc.components, "html", lambda html, height: calls.html.append((html, height)))
+    monkeypatch.setattr(gc, "_component", lambda **kw: calls.component.append(kw) or {"action": "draw", "id": "e1"})
+    monkeypatch.setattr(gc, "_published", None)
+    monkeypatch.setattr(gc, "_inline", None)
+    return calls
+
+
+def test_writable_frontend_uses_component(tmp_path, monkeypatch, calls):
+    monkeypatch.setattr(gc, "FRONTEND_DIR", tmp_path)
+    assert gc.publish_frontend("m.png", "b.png")
+    assert "m.png" in (tmp_path / "index.html").read_text(encoding="utf-8")
+    assert gc.gashapon("减脂", MODES, IDLE) == {"action": "draw", "id": "e1"}
+    assert calls.component and not calls.html
+
+
+def test_read_only_frontend_renders_inline(tmp_path, monkeypatch, calls):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("", encoding="utf-8")
+    monkeypatch.setattr(gc, "FRONTEND_DIR", blocker / "gashapon")
+    assert gc.publish_frontend("m.png", "b.png")
+    assert gc.gashapon("放纵", MODES, IDLE, height=700) is None
+    assert not calls.component
+    (html, height), = calls.html
+    assert height == 700 and "m.png" in html
+    head = html.index("<head>")
+    assert html.index('window.WAIMAI_INLINE = {"mode": "放纵"') > head
+    assert html.index("window.WAIMAI_INLINE") < html.index("function waimaiEmit")
+    # 目录恢复可写后重新发布，回到双向组件
+    monkeypatch.setattr(gc, "_published", None)
+    monkeypatch.setattr(gc, "FRONTEND_DIR", tmp_path)
+    assert gc.publish_frontend("m.png", "b.png")
+    gc.gashapon("放纵", MODES, IDLE)
+    assert len(calls.html) == 1 and calls.component
+
+
+def test_import_survives_read_only_build_dir():
+    """build/components 建不了目录时模块照常导入（之前在导入时直接抛 OSError）。"""
+    code = (
+        "import pathlib\n"
+        "mkdir = pathlib.Path.mkdir\n"
+        "def refuse(self, *a, **k):\n"
+        "    if 'components' in self.parts:\n"
+        "        raise PermissionError(13, 'Read-only file system', str(self))\n"
+        "    return mkdir(self, *a, **k)\n"
+        "pathlib.Path.mkdir = refuse\n"
+        "import gashapon_component\n"
+        "print('ok')\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0 and out.stdout.strip().endswith("ok"), out.stderr
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""icon_atlas：没有单独图标的品类按菜品库里的 "图标" 取 sprite 格，未填或格名不对时用 DEFAULT_CELL。"""
+import json
+import sys
+
+import pytest
+
+import asset_pipeline
+import icon_atlas
+from config import catalogue
+
+
+@pytest.fixture
+def foods_file(tmp_path, monkeypatch):
+    doc = {
+        "减脂": {"菜品": [
+            {"品类": "楼下轻食", "搭配": "鸡胸沙拉", "图标": "饭团"},
+            {"品类": "麦当劳", "搭配": "双吉士汉堡"},
+            {"品类": "写错格名", "搭配": "x", "图标": "不存在的格"},
+        ]},
+        "放纵": {"菜品": [
+            {"品类": "新开的咖啡馆", "搭配": "拿铁", "图标": "咖啡"},
+            {"品类": "没填图标的新店", "搭配": "随便"},
+        ]},
+    }
+    path = tmp_path / "foods.json"
+    path.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(catalogue, "FOODS_FILE", path)
+    monkeypatch.setattr(icon_atlas, "ATLAS_MANIFEST", tmp_path / "no-atlas.json")
+    catalogue.reload()
+    yield path
+    monkeypatch.undo()
+    catalogue.reload()
+
+
+def _cell(tile):
+    x, y, w, _ = tile.box
+    return next(name for name, cell in icon_atlas.SPRITE_CELLS.items() if cell == (x, y, w))
+
+
+@pytest.fixture
+def no_pillow(monkeypatch):
+    """运行时不许用 Pillow：之后任何 import PIL 都抛 ImportError。"""
+    monkeypatch.setitem(sys.modules, "PIL", None)
+
+
+def test_icon_field_picks_sprite_cell(foods_file, no_pillow):
+    index = icon_atlas.icon_index()
+    assert index["楼下轻食"].sheet == asset_pipeline.image_size("food-icons/sprite.png") == (1024, 1024)
+    assert _cell(index["楼下轻食"]) == "饭团"
+    assert _cell(index["新开的咖啡馆"]) == "咖啡"
+
+
+def test_fallbacks(foods_file):
+    index = icon_atlas.icon_index()
+    assert _cell(index["麦当劳"]) == icon_atlas.DEFAULT_CELL
+    assert _cell(index["写错格名"]) == icon_atlas.DEFAULT_CELL
+    assert _cell(index["没填图标的新店"]) == icon_atlas.DEFAULT_CELL
+
+
+def test_shipped_catalogue_sets_an_icon_for_every_entry():
+    cat = catalogue.reload()
+    for mode in catalogue.MODES:
+        for name, entry in cat.foods(mode).items():
+            assert entry.图标 in icon_atlas.SPRITE_CELLS, (mode, name, entry.图标)
+
+
+def test_image_size_reads_headers_without_manifest(monkeypatch, no_pillow):
+    """未构建时从文件头读尺寸：PNG 与扩展名为 .png 的 JPEG 都行，文件不存在为 None。"""
+    monkeypatch.setattr(asset_pipeline, "MANIFEST", asset_pipeline.BUILD_DIR / "no-manifest.json")
+    assert asset_pipeline.image_size("machine.png") == (1024, 1024)
+    assert asset_pipeline.image_size("ball-left.png") == (962, 1024)
+    assert asset_pipeline.image_size("没有这张图.png") is None
+
+
+def test_atlas_built_by_pipeline_is_read_without_pillow(foods_file, tmp_path, monkeypatch):
+    pytest.importorskip("PIL")
+    monkeypatch.setattr(icon_atlas, "ATLAS_DIR", tmp_path / "atlas")
+    monkeypatch.setattr(icon_atlas, "ATLAS_IMAGE", tmp_path / "atlas" / "atlas.webp")
+    monkeypatch.setattr(icon_atlas, "ATLAS_MANIFEST", tmp_path / "atlas" / "atlas.json")
+    manifest = asset_pipeline.build_atlas()
+    assert set(manifest["icons"]) >= {f"sprite:{cell}" for cell in icon_atlas.SPRITE_CELLS}
+
+    monkeypatch.setitem(sys.modules, "PIL", None)
+    tile = icon_atlas.food_icon("新开的咖啡馆")
+    assert tile.path == icon_atlas.ATLAS_IMAGE
+    assert tile.sheet == tuple(manifest["size"])
+    assert list(tile.box) == manifest["icons"]["sprite:咖啡"]
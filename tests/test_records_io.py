@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""records_io：CSV / JSONL 导出再导入不丢不改，任一条无效则整次导入不写入。"""
+import io
+import json
+
+import pytest
+
+import records_io
+
+RECORDS = [
+    {"菜品名": "三文鱼饭", "金额": 32.5, "热量": 520, "模式": "减脂", "品类": "日料", "创建时间": "2026-10-12 12:01:00", "用户": "u1"},
+    {"菜品名": "炸鸡, 双拼", "金额": 45.0, "热量": 1300, "模式": "放纵", "品类": "炸鸡", "创建时间": "2026-10-17 19:30:00", "用户": "u1"},
+    {"菜品名": '带"引号"\n换行', "金额": 18.0, "热量": 410, "模式": "减脂", "品类": "轻食沙拉", "创建时间": "2026-10-13 08:00:00", "用户": "u2"},
+]
+
+
+def _fresh(db, tmp_path, monkeypatch, name: str):
+    db.close_db()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / name)
+    db.init_db()
+
+
+@pytest.mark.parametrize("fmt", records_io.FORMATS)
+def test_export_import_round_trip(fresh_db, tmp_path, monkeypatch, fmt):
+    fresh_db.insert_records(RECORDS)
+    exported = list(fresh_db.iter_records())
+    buf = io.StringIO()
+    records_io.export_records(buf, fmt)
+
+    _fresh(fresh_db, tmp_path, monkeypatch, f"import-{fmt}.db")
+    text = buf.getvalue().lstrip("\ufeff")  # CSV 的 BOM：命令行按 utf-8-sig 读入时会去掉
+    assert records_io.import_records(io.StringIO(text, newline=""), fmt) == len(RECORDS)
+    imported = list(fresh_db.iter_records())
+    # CSV 里全是字符串，导入时按列类型还原
+    assert imported == exported
+    assert [r["区间"] for r in imported] == ["工作日", "周末", "工作日"]
+    assert fresh_db.get_range_stats("2026-10-12", "2026-10-18", "week", 用户="u1")[0]["用餐次数"] == 2
+    assert fresh_db.check_weekly_summary() == []
+
+
+def test_export_single_user(fresh_db):
+    fresh_db.insert_records(RECORDS)
+    lines = list(records_io.iter_export("jsonl", 用户="u2"))
+    assert [json.loads(line)["菜品名"] for line in lines] == [RECORDS[2]["菜品名"]]
+
+
+def test_invalid_row_rolls_back_whole_import(fresh_db):
+    """无效记录在第二批（insert_records 每批 5000 条）：前一批已 executemany 的也一并回滚。"""
+    good = dict(RECORDS[0])
+    lines = [json.dumps(good, ensure_ascii=False)] * 5001 + [json.dumps(dict(good, 金额="十块"), ensure_ascii=False)]
+    with pytest.raises(ValueError, match="第 5002 条"):
+        records_io.import_records(io.StringIO("\n".join(lines)), "jsonl")
+    assert list(fresh_db.iter_records()) == []
+    assert fresh_db.get_range_stats("2026-01-01", "2026-12-31", 用户="u1") == []
+
+
+def test_cli_import_failure_writes_nothing(fresh_db, tmp_path, capsys):
+    path = tmp_path / "bad.csv"
+    path.write_text("菜品名,金额,热量,模式,品类,创建时间\n好,10,300,减脂,日料,2026-10-12 12:00:00\n坏,10,300,减脂,日料,不是时间\n", encoding="utf-8")
+    assert records_io.main(["import", str(path)]) == 1
+    assert "未写入任何记录" in capsys.readouterr().err
+    assert list(fresh_db.iter_records()) == []
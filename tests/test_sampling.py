@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""config.sampling.AliasTable：固定种子下抽样频率与配置权重一致（卡方检验）。"""
+import random
+from collections import Counter
+
+import pytest
+
+from config.sampling import AliasTable
+
+N = 200_000
+
+
+def _chi2_critical(df: int, z: float = 3.09) -> float:
+    """卡方分布 99.9% 分位数（Wilson–Hilferty 近似），不依赖 scipy。"""
+    return df * (1 - 2 / (9 * df) + z * (2 / (9 * df)) ** 0.5) ** 3
+
+
+def _assert_matches(table: AliasTable, counts: Counter, weights: dict) -> None:
+    total = sum(weights.values())
+    assert sum(counts.values()) == N
+    for key, w in weights.items():
+        if w == 0:
+            assert counts[key] == 0, key
+    live = [k for k, w in weights.items() if w > 0]
+    chi2 = sum((counts[k] - N * weights[k] / total) ** 2 / (N * weights[k] / total) for k in live)
+    if len(live) > 1:
+        assert chi2 < _chi2_critical(len(live) - 1), chi2
+    for key, p in table.probabilities():
+        assert p == pytest.approx(weights[key] / total)
+
+
+WEIGHT_SETS = {
+    "uniform": {f"k{i}": 1.0 for i in range(20)},
+    "skewed": {"a": 50.0, "b": 20.0, "c": 10.0, "d": 5.0, "e": 1.0, "f": 0.5, "g": 0.1},
+    "with_zeros": {"a": 3.0, "z1": 0.0, "b": 1.0, "z2": 0.0, "c": 0.3, "z3": 0.0},
+    "single": {"only": 2.5},
+    "single_live": {"z1": 0.0, "live": 1.0, "z2": 0.0},
+}
+
+
+@pytest.mark.parametrize("name", sorted(WEIGHT_SETS))
+def test_sample_frequencies_match_weights(name):
+    weights = WEIGHT_SETS[name]
+    table = AliasTable(list(weights), list(weights.values()))
+    rng = random.Random(20261018)
+    counts = Counter(table.sample(rng) for _ in range(N))
+    _assert_matches(table, counts, weights)
+
+
+@pytest.mark.parametrize("name", sorted(WEIGHT_SETS))
+def test_sample_many_frequencies_match_weights(name):
+    np = pytest.importorskip("numpy")
+    weights = WEIGHT_SETS[name]
+    table = AliasTable(list(weights), list(weights.values()))
+    index = table.sample_many(N, np.random.default_rng(20261018))
+    counts = Counter(dict(zip(table.keys, np.bincount(index, minlength=table.n).tolist())))
+    _assert_matches(table, counts, weights)
+
+
+def test_same_seed_same_sequence():
+    table = AliasTable.from_weights("abcde", {"a": 5, "e": 0.5})
+    a, b = random.Random(7), random.Random(7)
+    assert [table.sample(a) for _ in range(1000)] == [table.sample(b) for _ in range(1000)]
+
+
+@pytest.mark.parametrize("keys, weights", [([], []), (["a"], [0.0]), (["a", "b"], [1.0, -1.0]), (["a"], [1.0, 2.0])])
+def test_invalid_weights_rejected(keys, weights):
+    with pytest.raises(ValueError):
+        AliasTable(keys, weights)